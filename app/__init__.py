@@ -1,14 +1,23 @@
+import os, time
 from flask import Flask
-from .config import COLOR_PRIMARY, COLOR_SECONDARY
+from .config import COLOR_PRIMARY, COLOR_SECONDARY, SECRET_KEY
 
 def create_app():
+    started = time.perf_counter()
     app = Flask(__name__)
+    app.secret_key = SECRET_KEY or os.urandom(24)
 
     from .views import bp
+    from .sheets import start_background_sync
+    from .metrics import registry
     app.register_blueprint(bp)
+    start_background_sync()
+    registry.start()
 
     @app.context_processor
     def inject_colors():
         return dict(COLOR_PRIMARY=COLOR_PRIMARY, COLOR_SECONDARY=COLOR_SECONDARY)
 
+    # Tidak ada panggilan jaringan saat startup; waktu ini dilaporkan di /healthz.
+    app.config['STARTUP_SECONDS'] = time.perf_counter() - started
     return app
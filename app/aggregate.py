@@ -0,0 +1,175 @@
+"""Single-pass aggregation of survey responses.
+
+``aggregate(headers, rows)`` walks the rows once and keeps, per question,
+the sum and count of valid scores both overall and per Puskesmas.  Every
+figure the dashboard needs (per-question averages, overall average,
+per-Puskesmas overall and per-question averages, response counts) is derived
+from those sums, so the cost is O(rows x questions).
+
+Averaging definition (same everywhere in the app): a question average is the
+mean of all valid (> 0) scores for that question; an overall average is the
+mean of the question averages (questions without any score count as 0).
+A Puskesmas average follows the same rule over that clinic's rows.  The
+static snapshot (``generate_static_site.py``) uses this module as well, so
+both surfaces report identical figures.
+"""
+from datetime import datetime
+from functools import lru_cache
+
+from .config import (
+    EVALUATION_THRESHOLD, META_COLUMNS_OFFSET, EXCLUDE_COLUMNS_BY_NAME, EXCLUDE_COLUMNS_BY_QUESTION, SCORE_MAP,
+    TIMESTAMP_FORMATS
+)
+
+NO_NAME = "<Tanpa Nama>"
+
+
+def get_question_columns(headers):
+    start = META_COLUMNS_OFFSET if META_COLUMNS_OFFSET is not None else 0
+    indices = list(range(start, len(headers)))
+    lower_exclude = {n.lower() for n in EXCLUDE_COLUMNS_BY_NAME}
+    lower_ex_q = {n.lower() for n in EXCLUDE_COLUMNS_BY_QUESTION}
+    if headers and headers[-1].strip().lower() in lower_exclude:
+        indices.pop(-1)
+    filtered = []
+    for i in indices:
+        name = headers[i].strip().lower()
+        if name in lower_exclude or name in lower_ex_q:
+            continue
+        filtered.append(i)
+    return filtered
+
+
+def get_puskesmas_index(headers):
+    try:
+        return next(i for i, h in enumerate(headers) if h.strip().lower() == "puskesmas")
+    except StopIteration:
+        return None
+
+
+def get_timestamp_index(headers):
+    """Index of the Google Form timestamp column ("Timestamp" / "Cap waktu")."""
+    limit = META_COLUMNS_OFFSET or len(headers)
+    for i, h in enumerate(headers[:limit]):
+        if h.strip().lower() in ("timestamp", "cap waktu", "waktu"):
+            return i
+    return None
+
+
+def parse_timestamp(val):
+    """Form timestamp -> ``datetime`` (None if empty or unparseable)."""
+    v = (val or "").strip()
+    if not v:
+        return None
+    for fmt in TIMESTAMP_FORMATS:
+        try:
+            return datetime.strptime(v, fmt)
+        except ValueError:
+            continue
+    return None
+
+
+@lru_cache(maxsize=8192)
+def map_score(val: str) -> float:
+    # Answers repeat a lot (a handful of Likert phrases), so decode each
+    # distinct cell string only once.
+    v = val.strip().lower()
+    try:
+        return float(v)
+    except ValueError:
+        return SCORE_MAP.get(v, 0.0)
+
+
+def remark(avg: float) -> str:
+    return "Evaluasi Diperlukan" if avg < EVALUATION_THRESHOLD else "OK"
+
+
+def _mean(values):
+    return sum(values) / len(values) if values else 0.0
+
+
+class Aggregate:
+    def __init__(self, headers):
+        self.headers = headers
+        self.qcols = get_question_columns(headers)
+        self.labels = [headers[i] for i in self.qcols]
+        self.p_idx = get_puskesmas_index(headers)
+        nq = len(self.qcols)
+        self.sums = [0.0] * nq
+        self.counts = [0] * nq
+        self.n_rows = 0
+        # name -> [sums, counts, n_rows]
+        self.groups = {}
+        self._pairs = list(enumerate(self.qcols))
+        self._min_len = (max(self.qcols) + 1) if self.qcols else 0
+
+    def group_key(self, r):
+        p = self.p_idx
+        if p is None:
+            return None
+        return r[p] if p < len(r) and r[p].strip() else NO_NAME
+
+    def add_rows(self, rows):
+        sums, counts, groups = self.sums, self.counts, self.groups
+        pairs, min_len, p = self._pairs, self._min_len, self.p_idx
+        nq = len(pairs)
+        score = map_score
+        for r in rows:
+            if p is not None:
+                key = r[p] if p < len(r) and r[p].strip() else NO_NAME
+                g = groups.get(key)
+                if g is None:
+                    g = groups[key] = [[0.0] * nq, [0] * nq, 0]
+                g[2] += 1
+                gs, gc = g[0], g[1]
+            else:
+                gs = gc = None
+            full = len(r) >= min_len
+            for j, c in pairs:
+                if not full and c >= len(r):
+                    continue
+                s = score(r[c])
+                if s > 0:
+                    sums[j] += s
+                    counts[j] += 1
+                    if gs is not None:
+                        gs[j] += s
+                        gc[j] += 1
+            self.n_rows += 1
+        return self
+
+    def add_row(self, r):
+        return self.add_rows((r,))
+
+    @property
+    def averages(self):
+        return [(s / c if c else 0.0) for s, c in zip(self.sums, self.counts)]
+
+    @property
+    def overall(self):
+        return _mean(self.averages)
+
+    @property
+    def puskesmas_list(self):
+        return sorted(self.groups)
+
+    def group_averages(self, name):
+        g = self.groups.get(name)
+        if g is None:
+            return [0.0] * len(self.qcols)
+        return [(s / c if c else 0.0) for s, c in zip(g[0], g[1])]
+
+    def group_overall(self, name):
+        return _mean(self.group_averages(name))
+
+    def group_count(self, name):
+        g = self.groups.get(name)
+        return g[2] if g else 0
+
+    def grouped(self):
+        """``[(puskesmas, overall_avg), ...]`` sorted by name."""
+        return [(k, self.group_overall(k)) for k in sorted(self.groups)]
+
+
+def aggregate(headers, rows):
+    return Aggregate(headers).add_rows(rows)
@@ -0,0 +1,204 @@
+"""In-process snapshot cache in front of the Google Sheets reads.
+
+All request threads of a worker share one ``SnapshotCache``.  Within the TTL the
+cached snapshot is served as-is; after the TTL (but inside the stale window) the
+last snapshot is still served immediately while a single background thread
+refreshes it (stale-while-revalidate).  Only when there is no usable snapshot
+does a request block on the loader, and concurrent requests then wait for that
+one load instead of each calling the API.  When a load only appended rows,
+the derived values that support ``add_row`` move to the new snapshot and
+absorb the new rows instead of being rebuilt.  ``invalidate`` bumps a generation
+counter, so a refresh that started before a write never installs its
+(pre-write) result.
+"""
+import threading
+import time
+
+
+class Snapshot:
+    """One view of the worksheet (headers + data rows).
+
+    Rows are only ever appended (``SnapshotCache.append``); any other change
+    produces a new snapshot.
+    """
+
+    def __init__(self, headers, rows, version=0):
+        self.headers = headers
+        self.rows = rows
+        self.version = version
+        self.loaded_at = time.time()
+        self._loaded_mono = time.monotonic()
+        self._derived = {}
+        self._derived_lock = threading.Lock()
+
+    def memo(self, key, factory):
+        """Value derived from this snapshot (aggregates, indexes), built once."""
+        try:
+            return self._derived[key]
+        except KeyError:
+            pass
+        with self._derived_lock:
+            if key not in self._derived:
+                self._derived[key] = factory()
+            return self._derived[key]
+
+    def age(self):
+        return time.monotonic() - self._loaded_mono
+
+    def _append(self, row):
+        # Derived values that can absorb a row in O(questions) (``add_row``) are
+        # updated in place; the rest are dropped and rebuilt on next use.
+        with self._derived_lock:
+            self.rows.append(row)
+            for key, value in list(self._derived.items()):
+                if hasattr(value, 'add_row'):
+                    value.add_row(row)
+                else:
+                    del self._derived[key]
+
+    def _carry(self, rows):
+        """Hand the ``add_row`` derived values over, extended by ``rows``."""
+        with self._derived_lock:
+            carried = {key: value for key, value in self._derived.items() if hasattr(value, 'add_row')}
+            self._derived = {}
+            for value in carried.values():
+                for row in rows:
+                    value.add_row(row)
+        return carried
+
+
+def _extends(prev, headers, rows):
+    """True if ``rows`` is ``prev.rows`` plus appended rows (same headers)."""
+    n = len(prev.rows)
+    # List equality checks identity first, so rows carried over cost one pointer compare.
+    return len(rows) > n and prev.headers == headers and rows[:n] == prev.rows
+
+
+class SnapshotCache:
+    def __init__(self, loader, ttl, stale_ttl):
+        self._loader = loader
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        self._snapshot = None
+        self._expired = False
+        self._generation = 0    # bumped by invalidate(); loads started earlier are not installed
+        self._version = 0
+        self._load_lock = threading.Lock()
+        self._state_lock = threading.Lock()
+        self._refreshing = False
+        self.hits = 0
+        self.stale_hits = 0
+        self.misses = 0
+        self.refreshes = 0
+        self.errors = 0
+        self.last_error = None
+
+    def get(self):
+        snap = self._snapshot
+        if snap is not None and not self._expired:
+            age = snap.age()
+            if age <= self.ttl:
+                self._count('hits')
+                return snap
+            if age <= self.ttl + self.stale_ttl:
+                self._count('stale_hits')
+                self._refresh_async()
+                return snap
+        return self._load_blocking(snap)
+
+    def invalidate(self):
+        """Force the next ``get`` to reload (used after writes to the sheet)."""
+        with self._state_lock:
+            self._generation += 1
+            self._expired = True
+
+    def append(self, row):
+        """Append one row to the current snapshot (push ingestion) and bump its version."""
+        snap = self.get()
+        with self._state_lock:
+            self._version += 1
+            snap.version = self._version
+        snap._append(row)
+        return snap
+
+    def stats(self):
+        snap = self._snapshot
+        return {
+            'hits': self.hits,
+            'stale_hits': self.stale_hits,
+            'misses': self.misses,
+            'refreshes': self.refreshes,
+            'errors': self.errors,
+            'last_error': str(self.last_error) if self.last_error else None,
+            'version': snap.version if snap else None,
+            'age_seconds': round(snap.age(), 3) if snap else None,
+            'rows': len(snap.rows) if snap else 0,
+            'ttl': self.ttl,
+            'stale_ttl': self.stale_ttl,
+            'refreshing': self._refreshing,
+        }
+
+    def _count(self, name):
+        with self._state_lock:
+            setattr(self, name, getattr(self, name) + 1)
+
+    def _load(self):
+        generation = self._generation
+        headers, rows = self._loader()
+        with self._state_lock:
+            if generation != self._generation:
+                # Invalidated while loading: the data may predate the write.
+                # Hand it to this caller only; the next ``get`` reloads.
+                return Snapshot(headers, rows, self._version)
+            prev = self._snapshot
+            if prev is not None and prev.headers is headers and prev.rows is rows:
+                # Loader found nothing new: keep version and derived data.
+                snap = Snapshot(headers, rows, prev.version)
+                snap._derived = prev._derived
+            elif prev is not None and _extends(prev, headers, rows):
+                self._version += 1
+                snap = Snapshot(headers, rows, self._version)
+                snap._derived = prev._carry(rows[len(prev.rows):])
+            else:
+                self._version += 1
+                snap = Snapshot(headers, rows, self._version)
+            self._snapshot = snap
+            self._expired = False
+        return snap
+
+    def _load_blocking(self, seen):
+        with self._load_lock:
+            # Another thread may have finished loading while we waited.
+            current = self._snapshot
+            if current is not None and current is not seen and not self._expired:
+                self._count('hits')
+                return current
+            self._count('misses')
+            try:
+                return self._load()
+            except Exception as e:
+                self._count('errors')
+                self.last_error = e
+                # Better an old snapshot than an error page.
+                if current is not None:
+                    return current
+                raise
+
+    def _refresh_async(self):
+        with self._state_lock:
+            if self._refreshing:
+                return
+            self._refreshing = True
+        threading.Thread(target=self._refresh, name='sheets-cache-refresh', daemon=True).start()
+
+    def _refresh(self):
+        try:
+            with self._load_lock:
+                self._load()
+            self._count('refreshes')
+            self.last_error = None
+        except Exception as e:  # pragma: no cover - logged via stats
+            self._count('errors')
+            self.last_error = e
+        finally:
+            self._refreshing = False
@@ -0,0 +1,210 @@
+"""Server-side charts (PNG / SVG) and the printable PDF report.
+
+Old tablets at the Puskesmas counters are slow with Chart.js, so
+``/chart/...`` and ``/report.pdf`` serve ready-made files instead.
+matplotlib (Agg backend) runs in a small process pool: rendering is CPU
+bound and pyplot is not thread-safe, so it stays out of the request
+threads.  ``ChartRenderer`` keeps the results in an LRU keyed by data
+version and bounded in bytes, and identical concurrent requests share one
+render.
+
+The render functions take plain, picklable data and import nothing from
+Flask or the sheets layer, so the spawned workers start quickly (scripts
+that serve charts need the usual ``if __name__ == '__main__':`` guard).
+matplotlib is optional: ``available()`` is False without it.
+"""
+import io
+import multiprocessing
+import textwrap
+import threading
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor, TimeoutError as RenderTimeout  # noqa: F401
+from concurrent.futures.process import BrokenProcessPool
+
+from .config import COLOR_PRIMARY, COLOR_SECONDARY, COLOR_INFO
+
+FORMATS = {'png': 'image/png', 'svg': 'image/svg+xml', 'pdf': 'application/pdf'}
+TABLE_ROWS_PER_PAGE = 32
+
+
+def available():
+    try:
+        import matplotlib  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+def _pyplot():
+    import matplotlib
+    matplotlib.use('Agg')
+    import matplotlib.pyplot as plt
+    return plt
+
+
+def _bar_figure(plt, title, subtitle, labels, values, threshold, width=9.0):
+    """Horizontal bars (long question texts fit), below-threshold bars highlighted."""
+    wrapped = [textwrap.fill(label or '-', 60) for label in labels]
+    lines = sum(w.count('\n') + 1 for w in wrapped)
+    fig, ax = plt.subplots(figsize=(width, max(2.5, 1.2 + 0.28 * lines + 0.12 * len(labels))))
+    pos = list(range(len(values)))[::-1]
+    colors = [COLOR_SECONDARY if v >= threshold else COLOR_PRIMARY for v in values]
+    ax.barh(pos, values, color=colors, height=0.7)
+    for y, v in zip(pos, values):
+        ax.text(min(v, 4.0) + 0.04, y, f'{v:.2f}', va='center', fontsize=8)
+    ax.axvline(threshold, color=COLOR_INFO, linestyle='--', linewidth=1)
+    ax.set_yticks(pos)
+    ax.set_yticklabels(wrapped, fontsize=8)
+    ax.set_xlim(0, 4.4)
+    ax.set_xlabel('Rata-rata skor (1-4)')
+    ax.set_title(title + (f'\n{subtitle}' if subtitle else ''), fontsize=11, loc='left')
+    ax.spines[['top', 'right']].set_visible(False)
+    fig.tight_layout()
+    return fig
+
+
+def _save(plt, fig, fmt):
+    buf = io.BytesIO()
+    # No timestamps in the metadata: the same data gives the same bytes.
+    metadata = {'Date': None} if fmt == 'svg' else {}
+    fig.savefig(buf, format=fmt, dpi=100, metadata=metadata)
+    plt.close(fig)
+    return buf.getvalue()
+
+
+def render_chart(spec, fmt):
+    """PNG/SVG bytes for ``spec`` (title, subtitle, labels, values, threshold)."""
+    plt = _pyplot()
+    fig = _bar_figure(plt, spec['title'], spec.get('subtitle'), spec['labels'],
+                      spec['values'], spec['threshold'])
+    return _save(plt, fig, fmt)
+
+
+def render_report(report):
+    """Multi-page PDF: summary + question chart, Puskesmas chart, Puskesmas table."""
+    plt = _pyplot()
+    from matplotlib.backends.backend_pdf import PdfPages
+
+    buf = io.BytesIO()
+    with PdfPages(buf, metadata={'Title': report['title'], 'CreationDate': None}) as pdf:
+        fig = _bar_figure(plt, report['title'], report['summary'], report['labels'],
+                          report['averages'], report['threshold'])
+        pdf.savefig(fig)
+        plt.close(fig)
+        grouped = report['grouped']
+        if grouped:
+            fig = _bar_figure(plt, 'Rata-rata per Puskesmas', None, [g['name'] for g in grouped],
+                              [g['avg'] for g in grouped], report['threshold'])
+            pdf.savefig(fig)
+            plt.close(fig)
+        for start in range(0, len(grouped), TABLE_ROWS_PER_PAGE):
+            chunk = grouped[start:start + TABLE_ROWS_PER_PAGE]
+            fig, ax = plt.subplots(figsize=(8.27, 11.69))  # A4
+            ax.axis('off')
+            table = ax.table(
+                cellText=[[g['name'], f"{g['avg']:.2f}", g['remark'], str(g['count'])] for g in chunk],
+                colLabels=['Puskesmas', 'Rata-rata', 'Keterangan', 'Respons'],
+                colWidths=[0.5, 0.15, 0.22, 0.13], loc='upper center')
+            table.auto_set_font_size(False)
+            table.set_fontsize(8)
+            table.scale(1, 1.4)
+            for (r, _), cell in table.get_celld().items():
+                if r == 0:
+                    cell.set_facecolor(COLOR_SECONDARY)
+                    cell.get_text().set_color('white')
+                elif chunk[r - 1]['avg'] < report['threshold']:
+                    cell.set_facecolor('#fde8dc')
+            ax.set_title(f'Ringkasan per Puskesmas ({start + 1}-{start + len(chunk)} dari {len(grouped)})',
+                         fontsize=11, loc='left')
+            pdf.savefig(fig)
+            plt.close(fig)
+    return buf.getvalue()
+
+
+class ChartRenderer:
+    """Process-pool renderer with a byte-bounded LRU of finished files."""
+
+    def __init__(self, max_workers=2, max_bytes=32 * 2**20, timeout=60.0):
+        self.max_workers = max(1, max_workers)
+        self.max_bytes = max_bytes
+        self.timeout = timeout
+        self._lock = threading.Lock()
+        self._pool = None
+        self._cache = OrderedDict()   # key -> bytes
+        self._bytes = 0
+        self._pending = {}            # key -> Future (renders in flight)
+        self.hits = 0
+        self.renders = 0
+        self.evictions = 0
+        self.errors = 0
+
+    def _executor(self):
+        if self._pool is None:
+            # spawn: the gunicorn worker has threads; forking it could copy held locks.
+            self._pool = ProcessPoolExecutor(self.max_workers,
+                                             mp_context=multiprocessing.get_context('spawn'))
+        return self._pool
+
+    def get(self, key, fn, make_args):
+        """Cached result of ``fn(*make_args())`` (run in the pool) for ``key``.
+
+        ``make_args`` is only called on a miss; waiting longer than ``timeout``
+        raises ``RenderTimeout`` (the render continues and is cached).
+        """
+        with self._lock:
+            data = self._cache.get(key)
+            if data is not None:
+                self._cache.move_to_end(key)
+                self.hits += 1
+                return data
+            fut = self._pending.get(key)
+        submitted = False
+        if fut is None:
+            args = make_args()  # outside the lock: may aggregate the snapshot
+            with self._lock:
+                fut = self._pending.get(key)
+                if fut is None:
+                    try:
+                        fut = self._pending[key] = self._executor().submit(fn, *args)
+                    except BrokenProcessPool:
+                        self._pool = None
+                        raise
+                    self.renders += 1
+                    submitted = True
+        if submitted:
+            fut.add_done_callback(lambda f: self._done(key, f))
+        try:
+            return fut.result(self.timeout)
+        except BrokenProcessPool:
+            with self._lock:
+                self._pool = None  # a worker died: start a fresh pool next time
+            raise
+
+    def _done(self, key, fut):
+        with self._lock:
+            self._pending.pop(key, None)
+            if fut.cancelled() or fut.exception() is not None:
+                self.errors += 1
+                return
+            data = fut.result()
+            if len(data) > self.max_bytes:
+                return
+            self._cache[key] = data
+            self._bytes += len(data)
+            while self._bytes > self.max_bytes:
+                _, old = self._cache.popitem(last=False)
+                self._bytes -= len(old)
+                self.evictions += 1
+
+    def stats(self):
+        with self._lock:
+            return {
+                'entries': len(self._cache),
+                'bytes': self._bytes,
+                'max_bytes': self.max_bytes,
+                'hits': self.hits,
+                'renders': self.renders,
+                'evictions': self.evictions,
+                'errors': self.errors,
+                'pending': len(self._pending),
+            }
@@ -0,0 +1,111 @@
+"""Lazy, shared Google Sheets client.
+
+Nothing touches the network at import time: the service account is
+authorized and the worksheet resolved on the first call to ``worksheet()``.
+A failed connection is retried after ``retry_seconds`` (instead of being
+remembered for the life of the worker), and ``reset()`` drops the client so
+the next call re-authorizes (used after 401 responses).  All threads share
+one gspread client whose HTTP session keeps a pool of keep-alive
+connections.
+"""
+import json
+import os
+import threading
+import time
+
+import gspread
+from oauth2client.service_account import ServiceAccountCredentials
+from requests.adapters import HTTPAdapter
+
+try:
+    from service_account_info import SERVICE_ACCOUNT_INFO  # type: ignore
+except Exception:  # pragma: no cover
+    SERVICE_ACCOUNT_INFO = {}
+
+SCOPE = [
+    "https://spreadsheets.google.com/feeds",
+    "https://www.googleapis.com/auth/drive"
+]
+
+
+def load_service_account_info():
+    sa_info = SERVICE_ACCOUNT_INFO
+    if not sa_info or not sa_info.get("private_key"):
+        env_json = os.getenv("CERIA_SKM_SERVICE_ACCOUNT_JSON")
+        if env_json:
+            sa_info = json.loads(env_json)
+    if not sa_info or not sa_info.get("private_key"):
+        raise RuntimeError("SERVICE_ACCOUNT_INFO belum diisi.")
+    return sa_info
+
+
+class SheetsClient:
+    def __init__(self, spreadsheet_id, worksheet_name, retry_seconds=30.0, pool_size=10):
+        self.spreadsheet_id = spreadsheet_id
+        self.worksheet_name = worksheet_name
+        self.retry_seconds = retry_seconds
+        self.pool_size = pool_size
+        self._lock = threading.Lock()
+        self._worksheet = None
+        self._override = None
+        self.last_error = None
+        self.last_error_at = None
+        self.connected_at = None
+        self.connect_seconds = None
+        self.connects = 0
+
+    def use(self, ws):
+        """Serve ``ws`` (e.g. ``fakes.FakeWorksheet``) instead of Google Sheets."""
+        with self._lock:
+            self._override = ws
+
+    def worksheet(self):
+        ws = self._override or self._worksheet
+        if ws is not None:
+            return ws
+        with self._lock:
+            if self._override or self._worksheet:
+                return self._override or self._worksheet
+            if self.last_error_at and time.monotonic() - self.last_error_at < self.retry_seconds:
+                raise RuntimeError(f"Tidak bisa akses Google Sheets: {self.last_error}")
+            try:
+                self._worksheet = self._connect()
+            except Exception as e:
+                self.last_error = e
+                self.last_error_at = time.monotonic()
+                raise RuntimeError(f"Tidak bisa akses Google Sheets: {e}") from e
+            self.last_error = None
+            self.last_error_at = None
+            return self._worksheet
+
+    def _connect(self):
+        started = time.perf_counter()
+        creds = ServiceAccountCredentials.from_json_keyfile_dict(load_service_account_info(), SCOPE)
+        gc = gspread.authorize(creds)
+        adapter = HTTPAdapter(pool_connections=2, pool_maxsize=self.pool_size)
+        gc.session.mount("https://", adapter)
+        ws = gc.open_by_key(self.spreadsheet_id).worksheet(self.worksheet_name)
+        self.connect_seconds = time.perf_counter() - started
+        self.connected_at = time.time()
+        self.connects += 1
+        return ws
+
+    def reset(self, error=None):
+        """Drop the client; the next ``worksheet()`` call re-authorizes."""
+        with self._lock:
+            self._worksheet = None
+            if error is not None:
+                self.last_error = error
+
+    def state(self):
+        """Connection state for /healthz (never calls the API)."""
+        return {
+            'connected': bool(self._override or self._worksheet),
+            'fake': self._override is not None,
+            'connected_at': self.connected_at,
+            'connect_seconds': self.connect_seconds,
+            'connects': self.connects,
+            'last_error': str(self.last_error) if self.last_error else None,
+            'retry_in_seconds': (max(0.0, self.retry_seconds - (time.monotonic() - self.last_error_at))
+                                 if self.last_error_at else None),
+        }
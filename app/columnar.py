@@ -0,0 +1,146 @@
+"""Optional NumPy columnar representation of a snapshot.
+
+``ScoreMatrix`` decodes every question cell once into an ``int8`` matrix
+(rows x questions, 0 = missing/invalid) plus an ``int32`` Puskesmas code per
+row.  Averages, per-Puskesmas averages and counts are then vectorized
+reductions (``sum`` / ``bincount``) instead of Python loops.  It exposes the
+same read API as ``aggregate.Aggregate`` and gives exactly the same numbers;
+``build`` returns ``None`` when NumPy is missing or a score does not fit the
+int8 encoding (e.g. a decimal typed into the sheet), and the caller then
+falls back to the pure-Python engine.
+"""
+from bisect import bisect_left
+
+from .aggregate import NO_NAME, get_question_columns, get_puskesmas_index, map_score, _mean
+
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover - numpy is optional
+    np = None
+
+
+def available():
+    return np is not None
+
+
+def _decode_column(rows, c):
+    score = map_score
+    vals = np.fromiter(
+        (score(r[c]) if c < len(r) else 0.0 for r in rows), dtype=np.float64, count=len(rows)
+    )
+    vals[~(vals > 0)] = 0.0  # negatives / NaN count as missing, like the Python path
+    if vals.size and (vals.max() > 127 or not np.array_equal(vals, np.floor(vals))):
+        return None
+    return vals.astype(np.int8)
+
+
+class ScoreMatrix:
+    def __init__(self, headers, qcols, p_idx, scores, codes, names):
+        self.headers = headers
+        self.qcols = qcols
+        self.labels = [headers[i] for i in qcols]
+        self.p_idx = p_idx
+        self.scores = scores
+        self.codes = codes
+        self.names = names
+        self.n_rows = scores.shape[0]
+        valid = scores > 0
+        self.sums = scores.sum(axis=0, dtype=np.int64).astype(np.float64).tolist()
+        self.counts = valid.sum(axis=0).astype(int).tolist()
+        self._index = {n: i for i, n in enumerate(names)}
+        g, nq = len(names), len(qcols)
+        if codes is not None and g and nq:
+            self.group_sums = np.stack(
+                [np.bincount(codes, weights=scores[:, j], minlength=g) for j in range(nq)], axis=1)
+            self.group_counts = np.stack(
+                [np.bincount(codes, weights=valid[:, j], minlength=g) for j in range(nq)], axis=1
+            ).astype(np.int64)
+        else:
+            self.group_sums = np.zeros((g, nq))
+            self.group_counts = np.zeros((g, nq), dtype=np.int64)
+        if codes is not None:
+            self.group_rows = np.bincount(codes, minlength=g)
+        else:
+            self.group_rows = np.zeros(g, dtype=np.int64)
+
+    @classmethod
+    def build(cls, headers, rows):
+        if np is None:
+            return None
+        qcols = get_question_columns(headers)
+        columns = []
+        for c in qcols:
+            col = _decode_column(rows, c)
+            if col is None:
+                return None
+            columns.append(col)
+        scores = np.stack(columns, axis=1) if columns else np.zeros((len(rows), 0), dtype=np.int8)
+        p = get_puskesmas_index(headers)
+        codes, names = None, []
+        if p is not None:
+            keys = np.array([r[p] if p < len(r) and r[p].strip() else NO_NAME for r in rows], dtype=object)
+            if len(keys):
+                uniq, codes = np.unique(keys, return_inverse=True)
+                names = list(uniq)
+                codes = codes.astype(np.int32)
+        return cls(headers, qcols, p, scores, codes, names)
+
+    @property
+    def averages(self):
+        return [(s / c if c else 0.0) for s, c in zip(self.sums, self.counts)]
+
+    @property
+    def overall(self):
+        return _mean(self.averages)
+
+    @property
+    def puskesmas_list(self):
+        return list(self.names)
+
+    def add_row(self, r):
+        """Absorb one appended row (push ingestion) in O(questions), like ``Aggregate.add_row``.
+
+        Only the sums, counts and per-Puskesmas arrays are updated; ``scores`` and
+        ``codes`` keep describing the rows the matrix was built from.
+        """
+        vals = [map_score(r[c]) if c < len(r) else 0.0 for c in self.qcols]
+        for j, v in enumerate(vals):
+            if v > 0:
+                self.sums[j] += v
+                self.counts[j] += 1
+        if self.p_idx is not None:
+            p = self.p_idx
+            key = r[p] if p < len(r) and r[p].strip() else NO_NAME
+            i = self._index.get(key)
+            if i is None:
+                i = bisect_left(self.names, key)  # keep the sorted order of np.unique
+                self.names.insert(i, key)
+                self.group_sums = np.insert(self.group_sums, i, 0.0, axis=0)
+                self.group_counts = np.insert(self.group_counts, i, 0, axis=0)
+                self.group_rows = np.insert(self.group_rows, i, 0)
+                self._index = {n: k for k, n in enumerate(self.names)}
+            for j, v in enumerate(vals):
+                if v > 0:
+                    self.group_sums[i, j] += v
+                    self.group_counts[i, j] += 1
+            self.group_rows[i] += 1
+        self.n_rows += 1
+        return self
+
+    def group_averages(self, name):
+        i = self._index.get(name)
+        if i is None:
+            return [0.0] * len(self.qcols)
+        sums = self.group_sums[i].tolist()
+        counts = self.group_counts[i].tolist()
+        return [(s / c if c else 0.0) for s, c in zip(sums, counts)]
+
+    def group_overall(self, name):
+        return _mean(self.group_averages(name))
+
+    def group_count(self, name):
+        i = self._index.get(name)
+        return int(self.group_rows[i]) if i is not None else 0
+
+    def grouped(self):
+        return [(k, self.group_overall(k)) for k in self.names]
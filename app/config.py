@@ -3,8 +3,68 @@ import os
 # Konfigurasi dasar aplikasi web CERIA SKM
 SPREADSHEET_ID = os.getenv("CERIA_SKM_SPREADSHEET_ID", "1MuNz33zko8kk-OTWz8lR_Lug9kkeJ-UgRkJmNz1TtfU")
 WORKSHEET_NAME = os.getenv("CERIA_SKM_WORKSHEET_NAME", "Form Responses 2")
+# Sumber data tambahan (opsional): "<spreadsheet_id>:<worksheet>" atau hanya "<worksheet>"
+# (spreadsheet default), dipisah ";". Semua sumber dimuat paralel (maks. SOURCES_MAX_WORKERS
+# thread) dan digabung per nama kolom. Kosong = hanya SPREADSHEET_ID / WORKSHEET_NAME.
+SOURCES = os.getenv("CERIA_SKM_SOURCES", "")
+SOURCES_MAX_WORKERS = int(os.getenv("CERIA_SKM_SOURCES_MAX_WORKERS", "4"))
 EVALUATION_THRESHOLD = float(os.getenv("CERIA_SKM_THRESHOLD", "3.0"))
 FORM_URL = os.getenv("CERIA_SKM_FORM_URL", "https://forms.gle/9wdnAW4BkxVRGcKp7")
+# Kunci sesi Flask (pesan flash). Wajib diisi di produksi agar sama di semua worker.
+SECRET_KEY = os.getenv("CERIA_SKM_SECRET_KEY", "")
+
+# Token untuk POST /api/ingest (push respons baru, mis. dari Apps Script onFormSubmit).
+# Kosong = endpoint nonaktif.
+INGEST_TOKEN = os.getenv("CERIA_SKM_INGEST_TOKEN", "")
+
+# Jumlah baris per halaman di /manage (bisa diubah lewat ?per_page=, maksimum MANAGE_MAX_PAGE_SIZE).
+MANAGE_PAGE_SIZE = int(os.getenv("CERIA_SKM_MANAGE_PAGE_SIZE", "50"))
+MANAGE_MAX_PAGE_SIZE = int(os.getenv("CERIA_SKM_MANAGE_MAX_PAGE_SIZE", "500"))
+
+# Cache snapshot sheet (detik): dalam CACHE_TTL data dianggap segar; sampai
+# CACHE_TTL + CACHE_STALE_TTL data lama tetap dilayani sambil di-refresh di background.
+CACHE_TTL = float(os.getenv("CERIA_SKM_CACHE_TTL", "30"))
+CACHE_STALE_TTL = float(os.getenv("CERIA_SKM_CACHE_STALE_TTL", "300"))
+
+# Anggaran request Sheets API per menit PER WORKER (kuota Google: 60 read/menit/user;
+# dengan 3 worker gunicorn -> 20 per worker). Error 429/5xx di-retry dengan backoff.
+SHEETS_QUOTA_PER_MINUTE = float(os.getenv("CERIA_SKM_SHEETS_QUOTA_PER_MINUTE", "20"))
+SHEETS_MAX_RETRIES = int(os.getenv("CERIA_SKM_SHEETS_MAX_RETRIES", "4"))
+# Koneksi dibuat saat pertama dibutuhkan; bila gagal dicoba lagi setelah SHEETS_RETRY_SECONDS.
+SHEETS_RETRY_SECONDS = float(os.getenv("CERIA_SKM_SHEETS_RETRY_SECONDS", "30"))
+SHEETS_POOL_SIZE = int(os.getenv("CERIA_SKM_SHEETS_POOL_SIZE", "10"))
+
+# Mode sinkronisasi: "incremental" hanya mengambil baris baru (append-only dari Google Form),
+# "full" selalu memuat ulang seluruh sheet. Full reload tetap dilakukan berkala sebagai jaring pengaman.
+SYNC_MODE = os.getenv("CERIA_SKM_SYNC_MODE", "incremental").strip().lower()
+FULL_RELOAD_SECONDS = float(os.getenv("CERIA_SKM_FULL_RELOAD_SECONDS", "900"))
+
+# Agregasi kolumnar NumPy (opsional): "auto" dipakai bila numpy terpasang dan jumlah
+# baris >= COLUMNAR_MIN_ROWS; "0" mematikan, "1" selalu dipakai bila numpy ada.
+USE_NUMPY = os.getenv("CERIA_SKM_USE_NUMPY", "auto").strip().lower()
+COLUMNAR_MIN_ROWS = int(os.getenv("CERIA_SKM_COLUMNAR_MIN_ROWS", "20000"))
+
+# Mirror SQLite lokal (kosong = nonaktif). Bila aktif, halaman membaca dari mirror dan
+# worker background menyinkronkan mirror dari Google Sheets setiap MIRROR_SYNC_SECONDS.
+MIRROR_PATH = os.getenv("CERIA_SKM_MIRROR_PATH", "")
+MIRROR_SYNC_SECONDS = float(os.getenv("CERIA_SKM_MIRROR_SYNC_SECONDS", "30"))
+
+# Dashboard live (SSE /api/dashboard-stream): interval cek versi data dan batas koneksi
+# per worker (tiap koneksi memakai satu thread gunicorn; sisanya kembali ke polling).
+LIVE_POLL_SECONDS = float(os.getenv("CERIA_SKM_LIVE_POLL_SECONDS", "5"))
+LIVE_MAX_CLIENTS = int(os.getenv("CERIA_SKM_LIVE_MAX_CLIENTS", "2"))
+LIVE_HEARTBEAT_SECONDS = float(os.getenv("CERIA_SKM_LIVE_HEARTBEAT_SECONDS", "20"))
+
+# Metrik Prometheus (/metrics). Dengan beberapa worker gunicorn isi METRICS_DIR (folder
+# bersama, dikosongkan saat start) agar /metrics menjumlahkan semua worker.
+METRICS_DIR = os.getenv("CERIA_SKM_METRICS_DIR", "")
+METRICS_FLUSH_SECONDS = float(os.getenv("CERIA_SKM_METRICS_FLUSH_SECONDS", "5"))
+
+# Grafik & laporan PDF server-side (/chart/..., /report.pdf; butuh matplotlib): jumlah proses
+# render per worker, batas memori cache hasil render (byte, per worker) dan batas waktu tunggu.
+CHART_WORKERS = int(os.getenv("CERIA_SKM_CHART_WORKERS", "1"))
+CHART_CACHE_BYTES = int(os.getenv("CERIA_SKM_CHART_CACHE_BYTES", str(32 * 1024 * 1024)))
+CHART_TIMEOUT_SECONDS = float(os.getenv("CERIA_SKM_CHART_TIMEOUT_SECONDS", "60"))
 
 COLOR_PRIMARY   = "#ff8c42"
 COLOR_SECONDARY = "#1e3a8a"
@@ -13,6 +73,12 @@ COLOR_BG        = "#f9fafb"
 
 META_COLUMNS_OFFSET = 8
 
+# Format kolom Timestamp/Cap waktu Google Form, dicoba berurutan (locale Indonesia dulu).
+TIMESTAMP_FORMATS = [f.strip() for f in os.getenv(
+    "CERIA_SKM_TIMESTAMP_FORMATS",
+    "%d/%m/%Y %H:%M:%S|%d/%m/%Y %H.%M.%S|%m/%d/%Y %H:%M:%S|%Y-%m-%d %H:%M:%S|%d/%m/%Y|%Y-%m-%d"
+).split("|") if f.strip()]
+
 EXCLUDE_COLUMNS_BY_NAME = {
     "Saran", "Saran/masukan", "Komentar", "Feedback",
     "Umpan Balik", "Kritik", "Catatan",
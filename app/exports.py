@@ -0,0 +1,98 @@
+"""Streaming CSV / Parquet export and HTTP caching helpers.
+
+CSV rows are written into a small buffer and yielded in chunks, optionally
+through a streaming gzip compressor, so a download never holds the whole
+file in memory.  Responses carry an ``ETag`` derived from the data version
+and answer ``If-None-Match`` with 304.
+"""
+import csv
+import io
+import zlib
+
+from flask import Response, request, stream_with_context
+
+CHUNK_SIZE = 64 * 1024
+
+
+def iter_csv(rows):
+    buf = io.StringIO()
+    writer = csv.writer(buf)
+    for row in rows:
+        writer.writerow(row)
+        if buf.tell() >= CHUNK_SIZE:
+            yield buf.getvalue().encode('utf-8')
+            buf.seek(0)
+            buf.truncate()
+    if buf.tell():
+        yield buf.getvalue().encode('utf-8')
+
+
+def iter_gzip(chunks, level=6):
+    comp = zlib.compressobj(level, zlib.DEFLATED, 31)  # wbits=31 -> gzip container
+    for chunk in chunks:
+        out = comp.compress(chunk)
+        if out:
+            yield out
+    yield comp.flush()
+
+
+def wants_gzip():
+    return request.accept_encodings['gzip'] > 0
+
+
+def not_modified(etag, last_modified=None):
+    """304 response if the client already has ``etag`` (else None).
+
+    ``If-Modified-Since`` is only consulted when no ``If-None-Match`` was sent.
+    Callers check this before building the body, so a hit costs nothing.
+    """
+    if request.if_none_match:
+        fresh = request.if_none_match.contains(etag)
+    else:
+        since = request.if_modified_since
+        fresh = bool(since and last_modified and int(last_modified.timestamp()) <= since.timestamp())
+    if not fresh:
+        return None
+    resp = Response(status=304)
+    resp.set_etag(etag)
+    resp.headers['Vary'] = 'Accept-Encoding'
+    if last_modified:
+        resp.last_modified = last_modified
+    return resp
+
+
+def csv_response(rows, filename, version):
+    """Stream ``rows`` (an iterable of lists) as a CSV attachment."""
+    gzip = wants_gzip()
+    etag = f"{version}-gz" if gzip else version
+    cached = not_modified(etag)
+    if cached is not None:
+        return cached
+    body = iter_csv(rows)
+    if gzip:
+        body = iter_gzip(body)
+    resp = Response(stream_with_context(body), mimetype='text/csv')
+    resp.headers['Content-Disposition'] = f'attachment; filename={filename}'
+    resp.headers['Vary'] = 'Accept-Encoding'
+    resp.headers['Cache-Control'] = 'no-cache'
+    if gzip:
+        resp.headers['Content-Encoding'] = 'gzip'
+    resp.set_etag(etag)
+    return resp
+
+
+def parquet_bytes(headers, rows):
+    """Columnar Parquet export (all cells as strings). Needs the optional ``pyarrow``."""
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    names, seen = [], {}
+    for h in headers:
+        name = h or 'kolom'
+        seen[name] = seen.get(name, 0) + 1
+        names.append(name if seen[name] == 1 else f"{name}_{seen[name]}")
+    columns = [pa.array([r[i] if i < len(r) else '' for r in rows], type=pa.string())
+               for i in range(len(headers))]
+    buf = io.BytesIO()
+    pq.write_table(pa.Table.from_arrays(columns, names=names), buf, compression='zstd')
+    return buf.getvalue()
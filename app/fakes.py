@@ -0,0 +1,226 @@
+"""Local stand-in for a gspread ``Worksheet`` (development, benchmarks).
+
+``FakeWorksheet`` keeps the values in memory, can add a fixed latency to
+every call and can inject API errors (e.g. 429 quota errors) so the
+scheduler, cache and sync code can be exercised without Google Sheets::
+
+    from app import sheets
+    from app.fakes import FakeWorksheet
+    ws = FakeWorksheet([headers] + rows, latency=0.5)
+    ws.queue_errors(429, 429)      # the next two calls fail with HTTP 429
+    sheets.use_worksheet(ws)
+
+``synthetic_responses(n)`` builds a realistic "Form Responses" sheet of any
+size for such experiments (see ``benchmarks/``).
+"""
+import random
+import threading
+import time
+
+from datetime import datetime, timedelta
+
+from gspread.exceptions import APIError
+from gspread.utils import a1_range_to_grid_range, a1_to_rowcol
+
+from .config import SCORE_MAP
+
+
+class FakeResponse:
+    def __init__(self, status_code, message=''):
+        self.status_code = status_code
+        self.text = message or f'HTTP {status_code}'
+
+    def json(self):
+        return {'error': {'code': self.status_code, 'message': self.text, 'status': 'FAKE'}}
+
+
+def api_error(status, message=''):
+    return APIError(FakeResponse(status, message))
+
+
+class FakeSpreadsheet:
+    """Applies ``updateCells`` / ``deleteDimension`` batch requests to a FakeWorksheet."""
+
+    def __init__(self, worksheet):
+        self.worksheet = worksheet
+        self.id = f'fake-{id(self):x}'  # unique, like a spreadsheet key
+
+    def batch_update(self, body):
+        ws = self.worksheet
+        ws._enter('batch_update')
+        with ws._lock:
+            for req in body.get('requests', []):
+                if 'updateCells' in req:
+                    spec = req['updateCells']
+                    rng = spec['range']
+                    for i, row in enumerate(spec['rows']):
+                        r = rng['startRowIndex'] + i
+                        while len(ws.values) <= r:
+                            ws.values.append([])
+                        target = ws.values[r]
+                        c0 = rng.get('startColumnIndex', 0)
+                        vals = [v.get('userEnteredValue', {}).get('stringValue', '') for v in row['values']]
+                        while len(target) < c0 + len(vals):
+                            target.append('')
+                        target[c0:c0 + len(vals)] = vals
+                elif 'deleteDimension' in req:
+                    rng = req['deleteDimension']['range']
+                    del ws.values[rng['startIndex']:rng['endIndex']]
+        return {'replies': [{} for _ in body.get('requests', [])]}
+
+
+class FakeWorksheet:
+    title = 'Fake'
+    id = 0
+
+    def __init__(self, values=None, latency=0.0, error_rate=0.0, error_status=429, seed=None):
+        self.values = [list(r) for r in (values or [])]
+        self.latency = latency
+        self.error_rate = error_rate
+        self.error_status = error_status
+        self.calls = {}
+        self._errors = []
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self.spreadsheet = FakeSpreadsheet(self)
+
+    def queue_errors(self, *statuses):
+        """Make the next ``len(statuses)`` calls fail with these HTTP statuses."""
+        with self._lock:
+            self._errors.extend(statuses)
+
+    def total_calls(self):
+        return sum(self.calls.values())
+
+    def _enter(self, name):
+        with self._lock:
+            self.calls[name] = self.calls.get(name, 0) + 1
+            status = self._errors.pop(0) if self._errors else None
+            if status is None and self.error_rate and self._random.random() < self.error_rate:
+                status = self.error_status
+        if self.latency:
+            time.sleep(self.latency)
+        if status is not None:
+            raise api_error(status)
+
+    # --- read API -----------------------------------------------------------
+    def get_all_values(self, **kwargs):
+        self._enter('get_all_values')
+        width = max((len(r) for r in self.values), default=0)
+        return [list(r) + [''] * (width - len(r)) for r in self.values]
+
+    def row_values(self, row, **kwargs):
+        self._enter('row_values')
+        if 1 <= row <= len(self.values):
+            vals = list(self.values[row - 1])
+            while vals and vals[-1] == '':
+                vals.pop()
+            return vals
+        return []
+
+    def batch_get(self, ranges, **kwargs):
+        self._enter('batch_get')
+        return [self._range_values(r) for r in ranges]
+
+    def _range_values(self, range_name):
+        grid = a1_range_to_grid_range(range_name.split('!')[-1])
+        r0 = grid.get('startRowIndex', 0)
+        r1 = grid.get('endRowIndex', len(self.values))
+        c0 = grid.get('startColumnIndex', 0)
+        c1 = grid.get('endColumnIndex')
+        out = []
+        for row in self.values[r0:r1]:
+            vals = list(row[c0:c1])
+            while vals and vals[-1] == '':
+                vals.pop()
+            out.append(vals)
+        # Like the real API: trailing empty rows are not returned.
+        while out and not out[-1]:
+            out.pop()
+        return out
+
+    # --- write API ----------------------------------------------------------
+    def update(self, range_name, values=None, **kwargs):
+        self._enter('update')
+        start = range_name.split('!')[-1].split(':')[0]
+        row, col = a1_to_rowcol(start)
+        with self._lock:
+            for i, vals in enumerate(values or []):
+                r = row - 1 + i
+                while len(self.values) <= r:
+                    self.values.append([])
+                target = self.values[r]
+                while len(target) < col - 1 + len(vals):
+                    target.append('')
+                target[col - 1:col - 1 + len(vals)] = list(vals)
+        return {'updatedRange': range_name}
+
+    def delete_rows(self, start_index, end_index=None):
+        self._enter('delete_rows')
+        end_index = end_index or start_index
+        with self._lock:
+            del self.values[start_index - 1:end_index]
+        return {}
+
+    def append_row(self, values, **kwargs):
+        self._enter('append_row')
+        with self._lock:
+            self.values.append(list(values))
+        return {}
+
+
+# --- synthetic data -----------------------------------------------------------
+META_HEADERS = ["Timestamp", "Nama", "Umur", "Jenis Kelamin", "Pendidikan", "Pekerjaan",
+                "Jenis Layanan", "Tanggal Kunjungan"]
+QUESTIONS = [
+    ("Bagaimana kesesuaian persyaratan pelayanan dengan jenis pelayanannya?", "sesuai"),
+    ("Bagaimana kemudahan prosedur pelayanan di Puskesmas ini?", "mudah"),
+    ("Bagaimana kecepatan waktu dalam memberikan pelayanan?", "baik"),
+    ("Bagaimana kewajaran biaya/tarif dalam pelayanan?", "sesuai"),
+    ("Bagaimana kesesuaian produk pelayanan dengan yang diberikan?", "sesuai"),
+    ("Bagaimana kompetensi/kemampuan petugas dalam pelayanan?", "baik"),
+    ("Bagaimana perilaku petugas terkait kesopanan dan keramahan?", "ramah"),
+    ("Bagaimana kualitas sarana dan prasarana?", "baik"),
+    ("Bagaimana penanganan pengaduan pengguna layanan?", "ditanggapi"),
+]
+_LIKERT_WEIGHTS = (5, 15, 50, 30)
+
+
+def _likert_answers():
+    """Answer phrases per family (``"baik"`` -> ``["Tidak baik", ..., "Sangat baik"]``)."""
+    families = {}
+    for phrase, score in SCORE_MAP.items():
+        families.setdefault(phrase.split()[-1], [None] * 4)[score - 1] = phrase.capitalize()
+    return families
+
+
+def synthetic_responses(n, puskesmas=40, seed=0, ragged=0.1, blank=0.02):
+    """``[headers] + rows`` shaped like the SKM Google Form response sheet.
+
+    Likert answers come from ``SCORE_MAP``, spread over ``puskesmas`` clinics.
+    A ``ragged`` share of rows lacks the trailing cells (as the Sheets API
+    returns them) and ``blank`` is the share of unanswered questions.
+    """
+    rnd = random.Random(seed)
+    families = _likert_answers()
+    headers = META_HEADERS + [q for q, _ in QUESTIONS] + ["Saran", "Puskesmas"]
+    answers = [families[f] for _, f in QUESTIONS]
+    clinics = [f"Puskesmas {i + 1:03d}" for i in range(puskesmas)]
+    start = datetime(2024, 1, 1, 7, 0, 0)
+    step = timedelta(days=365) / max(n, 1)
+    rows = []
+    for i in range(n):
+        ts = start + step * i
+        row = [ts.strftime("%d/%m/%Y %H:%M:%S"), f"Responden {i + 1}", str(rnd.randint(17, 80)),
+               rnd.choice(("Laki-laki", "Perempuan")), rnd.choice(("SD", "SMP", "SMA", "D3", "S1")),
+               rnd.choice(("PNS", "Swasta", "Wiraswasta", "Petani", "Lainnya")),
+               rnd.choice(("Poli Umum", "Poli Gigi", "KIA", "Laboratorium", "Farmasi")),
+               ts.strftime("%d/%m/%Y")]
+        for opts in answers:
+            row.append('' if rnd.random() < blank else rnd.choices(opts, _LIKERT_WEIGHTS)[0])
+        row.append('')
+        row.append(rnd.choice(clinics))
+        if rnd.random() < ragged:
+            del row[rnd.randint(len(META_HEADERS) + 1, len(row) - 1):]
+        rows.append(row)
+    return [headers] + rows
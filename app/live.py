@@ -0,0 +1,119 @@
+"""Shared producer for the live dashboard stream (Server-Sent Events).
+
+One background thread per worker polls the data version (every
+``poll_seconds`` or immediately after ``kick()``), builds the dashboard
+payload once when it changes, works out what changed, serializes the SSE
+frame once and hands the same bytes to every connected client.  The cost of
+a data change therefore does not depend on the number of open screens.
+"""
+import json
+import logging
+import queue
+import threading
+
+log = logging.getLogger(__name__)
+
+
+def sse_frame(event, data):
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False, separators=(',', ':'))}\n\n".encode('utf-8')
+
+
+def dashboard_delta(old, new):
+    """Changed per-question and per-Puskesmas values between two payloads.
+
+    Returns None when the question set changed (clients need a full snapshot).
+    """
+    if old is None or old['labels'] != new['labels']:
+        return None
+    old_groups = {g['name']: g for g in old['grouped']}
+    new_groups = {g['name']: g for g in new['grouped']}
+    return {
+        'data_version': new['data_version'],
+        'overall': new['overall'],
+        'overall_remark': new['overall_remark'],
+        'responses': new['responses'],
+        'averages': {i: a for i, (a, b) in enumerate(zip(new['averages'], old['averages'])) if a != b},
+        'grouped': [g for name, g in new_groups.items() if old_groups.get(name) != g],
+        'removed': [name for name in old_groups if name not in new_groups],
+        'puskesmas_list': new['puskesmas_list'] if new['puskesmas_list'] != old['puskesmas_list'] else None,
+    }
+
+
+class DashboardBroadcaster:
+    def __init__(self, build, poll_seconds=5.0, max_clients=8, queue_size=16):
+        """``build()`` returns ``(data_version, payload)`` for the unfiltered dashboard."""
+        self._build = build
+        self.poll_seconds = poll_seconds
+        self.max_clients = max_clients
+        self._queue_size = queue_size
+        self._subscribers = set()
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._thread = None
+        self._version = None
+        self._payload = None
+        self._snapshot_frame = None
+        self.events = 0
+
+    def _refresh(self):
+        version, payload = self._build()
+        if version == self._version:
+            return None
+        delta = dashboard_delta(self._payload, payload)
+        self._version, self._payload = version, payload
+        self._snapshot_frame = sse_frame('snapshot', payload)
+        self.events += 1
+        return self._snapshot_frame if delta is None else sse_frame('delta', delta)
+
+    def _publish(self, frame):
+        with self._lock:
+            subscribers = list(self._subscribers)
+        for q in subscribers:
+            try:
+                q.put_nowait(frame)
+            except queue.Full:
+                # Too slow: disconnect; EventSource reconnects and gets a fresh snapshot.
+                self.unsubscribe(q)
+                with q.mutex:
+                    q.queue.clear()
+                q.put_nowait(None)
+
+    def _run(self):
+        while True:
+            self._wake.wait(self.poll_seconds)
+            self._wake.clear()
+            if not self._subscribers:
+                continue
+            try:
+                with self._lock:
+                    frame = self._refresh()
+            except Exception as e:  # pragma: no cover - keep the producer alive
+                log.warning("Live dashboard refresh gagal: %s", e)
+                continue
+            if frame is not None:
+                self._publish(frame)
+
+    def kick(self):
+        """Check for new data now (after ingest / writes)."""
+        self._wake.set()
+
+    def subscribe(self):
+        """Register a client; returns ``(queue, snapshot_frame)`` or None when full."""
+        with self._lock:
+            if len(self._subscribers) >= self.max_clients:
+                return None
+            if self._snapshot_frame is None:
+                self._refresh()
+            q = queue.Queue(maxsize=self._queue_size)
+            self._subscribers.add(q)
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name='dashboard-live', daemon=True)
+                self._thread.start()
+            return q, self._snapshot_frame
+
+    def unsubscribe(self, q):
+        with self._lock:
+            self._subscribers.discard(q)
+
+    def stats(self):
+        return {'clients': len(self._subscribers), 'events': self.events, 'data_version': self._version}
@@ -0,0 +1,199 @@
+"""Request phase timing (``Server-Timing``) and Prometheus metrics.
+
+Hot paths wrap their work in ``phase(name)`` -- ``sheets`` (API calls),
+``aggregate`` (aggregation / rollups), ``serialize`` (JSON) and ``render``
+(Jinja).  Each phase is observed in the ``ceria_phase_seconds`` histogram
+and, inside a request, added to that request's ``Server-Timing`` header.
+
+Counters and histograms live in memory per process.  With
+``CERIA_SKM_METRICS_DIR`` set, every gunicorn worker writes its totals to
+``<dir>/worker-<pid>.json`` (from a daemon thread every ``flush_seconds``, so
+idle workers and background threads are covered too, and whenever /metrics
+is served) and /metrics sums all files, so the figures cover every worker.  Files of exited workers are kept so counters never go backwards;
+clear the directory when (re)starting gunicorn.
+"""
+import glob
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+from flask import g, has_request_context
+
+from .config import METRICS_DIR, METRICS_FLUSH_SECONDS
+
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+
+def _key(labels):
+    return tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+
+def _escape(value):
+    return str(value).replace('\\', r'\\').replace('"', r'\"').replace('\n', r'\n')
+
+
+def _labels(pairs, extra=()):
+    items = list(pairs) + list(extra)
+    if not items:
+        return ''
+    return '{' + ','.join(f'{k}="{_escape(v)}"' for k, v in items) + '}'
+
+
+class Registry:
+    def __init__(self, directory='', flush_seconds=5.0):
+        self.directory = directory
+        self.flush_seconds = flush_seconds
+        self._lock = threading.Lock()
+        self._counters = {}     # (name, labels) -> value
+        self._histograms = {}   # (name, labels) -> [bucket counts..., +Inf count, sum]
+        self._collectors = []
+        self._meta = {}         # name -> (type, help)
+        self._flusher_pid = None
+        self._flush_lock = threading.Lock()   # timer thread and /metrics write the same file
+
+    def describe(self, name, kind, text):
+        self._meta[name] = (kind, text)
+
+    def inc(self, name, value=1, **labels):
+        key = (name, _key(labels))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + value
+
+    def observe(self, name, seconds, **labels):
+        key = (name, _key(labels))
+        with self._lock:
+            h = self._histograms.get(key)
+            if h is None:
+                h = self._histograms[key] = [0] * (len(BUCKETS) + 1) + [0.0]
+            for i, bound in enumerate(BUCKETS):
+                if seconds <= bound:
+                    h[i] += 1
+                    break
+            else:
+                h[len(BUCKETS)] += 1
+            h[-1] += seconds
+
+    def add_collector(self, fn):
+        """``fn()`` yields ``(name, labels_dict, value)`` for cumulative counters kept elsewhere."""
+        self._collectors.append(fn)
+
+    # --- cross-process ------------------------------------------------------
+    def _state(self):
+        with self._lock:
+            counters = [[n, list(map(list, l)), v] for (n, l), v in self._counters.items()]
+            histograms = [[n, list(map(list, l)), list(h)] for (n, l), h in self._histograms.items()]
+        for fn in self._collectors:
+            for name, labels, value in fn():
+                counters.append([name, list(map(list, _key(labels))), value])
+        return {'counters': counters, 'histograms': histograms}
+
+    def start(self):
+        """Start the flush thread of this process (no-op without ``directory``).
+
+        Checked per process: a thread started before gunicorn forks does not
+        run in the workers.
+        """
+        if not self.directory or self._flusher_pid == os.getpid():
+            return
+        with self._lock:
+            if self._flusher_pid == os.getpid():
+                return
+            self._flusher_pid = os.getpid()
+        threading.Thread(target=self._flush_loop, name='metrics-flush', daemon=True).start()
+
+    def _flush_loop(self):
+        while True:
+            time.sleep(self.flush_seconds)
+            try:
+                self.flush()
+            except OSError:  # pragma: no cover - retried on the next tick
+                pass
+
+    def flush(self):
+        """Write this worker's totals to ``<directory>/worker-<pid>.json``."""
+        if not self.directory:
+            return
+        os.makedirs(self.directory, exist_ok=True)
+        path = os.path.join(self.directory, f'worker-{os.getpid()}.json')
+        tmp = path + '.tmp'
+        with self._flush_lock:
+            with open(tmp, 'w', encoding='utf-8') as f:
+                json.dump(self._state(), f)
+            os.replace(tmp, path)
+
+    def _merged(self):
+        if not self.directory:
+            states = [self._state()]
+        else:
+            self.flush()
+            states = []
+            for path in glob.glob(os.path.join(self.directory, 'worker-*.json')):
+                try:
+                    with open(path, encoding='utf-8') as f:
+                        states.append(json.load(f))
+                except (OSError, ValueError):
+                    continue
+        counters, histograms = {}, {}
+        for st in states:
+            for name, labels, value in st['counters']:
+                key = (name, tuple(map(tuple, labels)))
+                counters[key] = counters.get(key, 0) + value
+            for name, labels, h in st['histograms']:
+                key = (name, tuple(map(tuple, labels)))
+                acc = histograms.setdefault(key, [0] * len(h))
+                histograms[key] = [a + b for a, b in zip(acc, h)]
+        return counters, histograms
+
+    def render(self):
+        """All metrics in the Prometheus text exposition format."""
+        counters, histograms = self._merged()
+        out = []
+        for name in sorted({n for n, _ in counters} | {n for n, _ in histograms}):
+            kind, text = self._meta.get(name, ('histogram' if any(n == name for n, _ in histograms)
+                                               else 'counter', name))
+            out.append(f'# HELP {name} {text}')
+            out.append(f'# TYPE {name} {kind}')
+            for (n, labels), value in sorted(counters.items()):
+                if n == name:
+                    out.append(f'{name}{_labels(labels)} {value}')
+            for (n, labels), h in sorted(histograms.items()):
+                if n != name:
+                    continue
+                cumulative = 0
+                for bound, count in zip(BUCKETS + ('+Inf',), h[:-1]):
+                    cumulative += count
+                    out.append(f'{name}_bucket{_labels(labels, [("le", bound)])} {cumulative}')
+                out.append(f'{name}_sum{_labels(labels)} {h[-1]}')
+                out.append(f'{name}_count{_labels(labels)} {cumulative}')
+        return '\n'.join(out) + '\n'
+
+
+registry = Registry(METRICS_DIR, METRICS_FLUSH_SECONDS)
+registry.describe('ceria_phase_seconds', 'histogram', 'Durasi per fase (sheets, aggregate, serialize, render)')
+registry.describe('ceria_request_duration_seconds', 'histogram', 'Durasi request HTTP per endpoint')
+registry.describe('ceria_requests_total', 'counter', 'Jumlah request HTTP per endpoint dan status')
+registry.describe('ceria_rows_processed_total', 'counter', 'Baris respons yang diproses per tahap')
+
+
+@contextmanager
+def phase(name):
+    """Time a block as phase ``name`` (histogram + this request's Server-Timing)."""
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - started
+        registry.observe('ceria_phase_seconds', elapsed, phase=name)
+        if has_request_context():
+            timings = g.setdefault('phase_timings', {})
+            timings[name] = timings.get(name, 0.0) + elapsed
+
+
+def server_timing(total=None):
+    """``Server-Timing`` header value for the current request."""
+    parts = [f'{name};dur={secs * 1000:.1f}' for name, secs in g.get('phase_timings', {}).items()]
+    if total is not None:
+        parts.append(f'total;dur={total * 1000:.1f}')
+    return ', '.join(parts)
@@ -0,0 +1,351 @@
+"""Local SQLite (WAL) mirror of the response worksheet.
+
+The mirror decouples page loads from the Google Sheets API: views read the
+snapshot from SQLite, while ``MirrorSync`` copies new rows from the sheet in
+a background thread.  If Google Sheets is slow or unreachable the app keeps
+serving the last mirrored data (also after a restart) and reports its age.
+
+Only one gunicorn worker syncs at a time (``flock`` on ``<path>.lock``); the
+others just read.  ``meta.rows_version`` counts changes of the responses
+table: a sync appends only if the table is still as it last wrote it (else
+another worker rewrote it, and its loader reloads in full), and readers
+fetch only the rows past the ones they have while no rewrite happened.  The
+``sync_once`` method can be driven directly with a ``fakes.FakeWorksheet``
+behind the loader.
+"""
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+
+from .aggregate import NO_NAME, get_puskesmas_index, get_timestamp_index, parse_timestamp
+from .pending import reconcile
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover - Windows: every worker syncs
+    fcntl = None
+
+log = logging.getLogger(__name__)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT NOT NULL);
+CREATE TABLE IF NOT EXISTS responses (
+    rownum    INTEGER PRIMARY KEY,   -- nomor baris data (1-based, tanpa header)
+    puskesmas TEXT,
+    ts        TEXT,                  -- ISO 8601 dari kolom Timestamp
+    data      TEXT NOT NULL          -- JSON array seluruh sel
+);
+CREATE INDEX IF NOT EXISTS idx_responses_puskesmas ON responses(puskesmas);
+CREATE INDEX IF NOT EXISTS idx_responses_ts ON responses(ts);
+"""
+
+
+class SheetMirror:
+    def __init__(self, path):
+        self.path = path
+        self._local = threading.local()
+        with self._connect() as conn:
+            conn.executescript(SCHEMA)
+
+    def _connect(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    # --- meta ---------------------------------------------------------------
+    def _meta(self, conn, key, default=None):
+        row = conn.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else default
+
+    def _set_meta(self, conn, **values):
+        conn.executemany("INSERT OR REPLACE INTO meta(key, value) VALUES (?, ?)",
+                         [(k, str(v)) for k, v in values.items()])
+
+    def version(self):
+        return int(self._meta(self._connect(), 'version', 0))
+
+    def synced_at(self):
+        """Unix time of the last successful sync (None if never synced)."""
+        v = self._meta(self._connect(), 'synced_at')
+        return float(v) if v else None
+
+    def changed_at(self):
+        """Unix time of the last data change (None if unknown), shared by all workers."""
+        v = self._meta(self._connect(), 'changed_at')
+        return float(v) if v else None
+
+    def age(self):
+        ts = self.synced_at()
+        return time.time() - ts if ts else None
+
+    def row_count(self):
+        return self._connect().execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+
+    def _read(self):
+        """Connection inside a read transaction: meta and rows from one state of the file."""
+        conn = self._connect()
+        conn.execute("BEGIN")
+        return conn
+
+    # --- write --------------------------------------------------------------
+    def _records(self, headers, rows, start):
+        p_idx = get_puskesmas_index(headers)
+        t_idx = get_timestamp_index(headers)
+        for n, r in enumerate(rows, start=start):
+            pusk = None
+            if p_idx is not None:
+                pusk = r[p_idx] if p_idx < len(r) and r[p_idx].strip() else NO_NAME
+            ts = parse_timestamp(r[t_idx]) if t_idx is not None and t_idx < len(r) else None
+            yield (n, pusk, ts.isoformat() if ts else None, json.dumps(r, ensure_ascii=False))
+
+    def apply(self, headers, rows, full, loaded_at=None, base=None):
+        """Store a loader result: replace everything (``full``) or append new rows.
+
+        Appending requires the table to be unchanged since ``base`` (the
+        ``rows_version`` returned by this loader's previous ``apply``); otherwise
+        nothing is written and None is returned.  Pushed rows still pending are
+        reconciled with the load (``app.pending``); ``loaded_at`` is the
+        ``time.time()`` at which the load started.  Returns the ``rows_version``.
+        """
+        conn = self._connect()
+        with conn:
+            conn.execute("BEGIN IMMEDIATE")
+            rows_version = int(self._meta(conn, 'rows_version', 0))
+            headers_json = json.dumps(headers, ensure_ascii=False)
+            now = time.time()
+            values = {'headers': headers_json, 'synced_at': now}
+            arrived = ()
+            if full or self._meta(conn, 'headers') != headers_json:
+                conn.execute("DELETE FROM responses")
+                conn.executemany("INSERT INTO responses VALUES (?, ?, ?, ?)",
+                                 self._records(headers, rows, 1))
+                rows_version += 1
+                values['rewritten'] = rows_version  # readers drop their rows
+            else:
+                if base != rows_version:
+                    return None
+                have = conn.execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+                if len(rows) > have:
+                    arrived = rows[have:]
+                    conn.executemany("INSERT INTO responses VALUES (?, ?, ?, ?)",
+                                     self._records(headers, arrived, have + 1))
+                    rows_version += 1
+            changed = rows_version != int(self._meta(conn, 'rows_version', 0))
+            pending = self._pending(conn)
+            kept = reconcile(headers, pending, arrived, loaded_at)
+            if len(kept) != len(pending):
+                values['pending'] = json.dumps(kept, ensure_ascii=False)
+                changed = True
+            if changed:
+                values['rows_version'] = rows_version
+                values['version'] = int(self._meta(conn, 'version', 0)) + 1
+                values['changed_at'] = now
+            self._set_meta(conn, **values)
+        return rows_version
+
+    def push_pending(self, row):
+        """Keep a pushed row until the sheet has it; returns the new version."""
+        conn = self._connect()
+        with conn:
+            pending = self._pending(conn) + [(time.time(), row)]
+            version = int(self._meta(conn, 'version', 0)) + 1
+            self._set_meta(conn, pending=json.dumps(pending, ensure_ascii=False), version=version,
+                           changed_at=time.time())
+        return version
+
+    def _pending(self, conn):
+        return [tuple(e) for e in json.loads(self._meta(conn, 'pending', '[]'))]
+
+    # --- read ---------------------------------------------------------------
+    def read_all(self):
+        conn = self._connect()
+        headers = json.loads(self._meta(conn, 'headers', '[]'))
+        rows = [json.loads(d) for (d,) in conn.execute("SELECT data FROM responses ORDER BY rownum")]
+        return headers, rows
+
+    def read_since(self, have, rewritten):
+        """Meta plus the rows after the first ``have`` (all rows if the table was
+        rewritten since ``rewritten``), read in one transaction."""
+        conn = self._read()
+        try:
+            meta = dict(conn.execute("SELECT key, value FROM meta"))
+            if meta.get('rewritten') != rewritten:
+                have = 0
+            rows = [json.loads(d) for (d,) in conn.execute(
+                "SELECT data FROM responses WHERE rownum > ? ORDER BY rownum", (have,))]
+        finally:
+            conn.commit()
+        return meta, have, rows
+
+    def rownums(self, rows_version, puskesmas=None, ts_from=None, ts_before=None):
+        """Row numbers matching the indexed columns (None if ``rows_version`` is not current).
+
+        ``ts_from`` / ``ts_before`` are ISO strings (inclusive / exclusive).
+        """
+        sql, args = ["SELECT rownum FROM responses WHERE 1=1"], []
+        if puskesmas is not None:
+            sql.append("AND puskesmas = ?")
+            args.append(puskesmas)
+        if ts_from is not None:
+            sql.append("AND ts >= ?")
+            args.append(ts_from)
+        if ts_before is not None:
+            sql.append("AND ts < ?")
+            args.append(ts_before)
+        sql.append("ORDER BY rownum")
+        conn = self._read()
+        try:
+            if int(self._meta(conn, 'rows_version', 0)) != rows_version:
+                return None
+            return [n for (n,) in conn.execute(" ".join(sql), args)]
+        finally:
+            conn.commit()
+
+
+class MirrorReader:
+    """Snapshot loader reading the mirror; re-reads only when its version moved.
+
+    Serves the mirrored rows followed by the pushed rows still pending.  After
+    an append only the new rows are read; the snapshot cache then extends the
+    previous aggregates instead of rebuilding them.
+    """
+
+    def __init__(self, mirror):
+        self.mirror = mirror
+        self._version = None
+        self._data = None
+        self._rows = []         # mirrored rows (without pending)
+        self._rewritten = None
+        self.rows_version = None
+        self.synced_at = None   # as of the last call; lets data_age() skip SQLite per response
+        self.changed_at = None  # meta.changed_at of the served data (Last-Modified)
+
+    def __call__(self):
+        version = self.mirror.version()
+        if self._data is not None and version == self._version:
+            return self._data
+        meta, have, new = self.mirror.read_since(len(self._rows), self._rewritten)
+        headers = json.loads(meta.get('headers', '[]'))
+        if have != len(self._rows) or self._data is None or headers != self._data[0]:
+            self._rows = new
+        elif new:
+            self._rows = self._rows + new
+        pending = [row for _, row in json.loads(meta.get('pending', '[]'))]
+        self._data = (headers, self._rows + pending)
+        self._rewritten = meta.get('rewritten')
+        self._version = int(meta.get('version', 0))
+        self.rows_version = int(meta.get('rows_version', 0))
+        self.synced_at = float(meta['synced_at']) if meta.get('synced_at') else None
+        self.changed_at = float(meta['changed_at']) if meta.get('changed_at') else None
+        return self._data
+
+    def accept(self, version, served):
+        """``served`` (our last list) already has the push that produced ``version``."""
+        if self._data is not None and served is self._data[1] and version == self._version + 1:
+            self._version = version
+            self.changed_at = self.mirror.changed_at()
+
+    def last_modified(self, served):
+        """``changed_at`` if ``served`` is the current list, else None."""
+        data = self._data
+        return self.changed_at if data is not None and served is data[1] else None
+
+    def rownums(self, served, puskesmas=None, ts_from=None, ts_before=None):
+        """``(indices, n)``: 0-based indices of matching mirrored rows in ``served``
+        (via the SQLite indexes) and ``n``, the number of mirrored rows in it;
+        None if ``served`` is not the current list or the table moved on."""
+        data = self._data
+        if data is None or served is not data[1]:
+            return None
+        n = len(self._rows)
+        found = self.mirror.rownums(self.rows_version, puskesmas, ts_from, ts_before)
+        if found is None:
+            return None
+        return [i - 1 for i in found if i <= n], n
+
+
+class MirrorSync:
+    def __init__(self, mirror, loader, interval):
+        self.mirror = mirror
+        self.loader = loader
+        self.interval = interval
+        self.last_error = None
+        self.last_success = None
+        self.syncs = 0
+        self._wake = threading.Event()
+        self._thread = None
+        self._lock = threading.Lock()
+        self._lock_file = None
+        self._base = None       # rows_version of our last write
+        self.stale_loads = 0
+
+    def _load_and_apply(self):
+        started = time.time()
+        headers, rows = self.loader()
+        return self.mirror.apply(headers, rows, full=getattr(self.loader, 'last_full', True),
+                                 loaded_at=started, base=self._base)
+
+    def sync_once(self):
+        with self._lock:
+            try:
+                written = self._load_and_apply()
+                if written is None:
+                    # Another worker rewrote the table (edit, delete, full reload): our
+                    # loader's rows may be stale, so reload them in full.
+                    self.stale_loads += 1
+                    self.loader.mark_dirty()
+                    written = self._load_and_apply()
+                self._base = written
+            except Exception as e:
+                self.last_error = e
+                log.warning("Sinkronisasi mirror gagal: %s", e)
+                return False
+            self.last_error = None
+            self.last_success = time.time()
+            self.syncs += 1
+            return True
+
+    def _is_leader(self):
+        if fcntl is None:
+            return True
+        if self._lock_file is None:
+            self._lock_file = open(self.mirror.path + '.lock', 'a')
+        try:
+            fcntl.flock(self._lock_file.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+            return True
+        except OSError:
+            return False
+
+    def _run(self):
+        while True:
+            if self._is_leader():
+                self.sync_once()
+            self._wake.wait(self.interval)
+            self._wake.clear()
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name='sheets-mirror-sync', daemon=True)
+            self._thread.start()
+
+    def kick(self):
+        self._wake.set()
+
+    def stats(self):
+        return {
+            'path': os.path.abspath(self.mirror.path),
+            'version': self.mirror.version(),
+            'rows': self.mirror.row_count(),
+            'age_seconds': self.mirror.age(),
+            'syncs': self.syncs,
+            'stale_loads': self.stale_loads,
+            'last_error': str(self.last_error) if self.last_error else None,
+            'running': self._thread is not None,
+        }
@@ -0,0 +1,89 @@
+"""Pushed (``/api/ingest``) rows waiting for their sheet row.
+
+A pushed response is served before the loader has read it from the sheet.
+It is kept apart from the loaded sheet rows -- the snapshot is ``sheet rows
++ pending`` -- so it never moves the loader's row offset: a test push (the
+README's ``curl``), a retried or a duplicate push can not take the place of
+the next real response.
+
+Apps Script pushes after the form row is written, so a load that started
+after a push has the row (or it will never come): such a load drops the
+pending row.  A row arriving from the sheet also drops its pending twin
+(same cells; the timestamp is ignored, Apps Script may format it
+differently).  Entries are ``(pushed_at, row)`` with ``time.time()``, so the
+mirror can keep them in SQLite for all workers.
+"""
+import threading
+import time
+
+from .aggregate import get_timestamp_index
+
+
+def row_key(headers, row):
+    """Cells that identify a response, for matching a pushed row to its sheet row."""
+    t = get_timestamp_index(headers)
+    width = len(headers)
+    cells = list(row[:width]) + [''] * (width - len(row))
+    return tuple(c.strip() for i, c in enumerate(cells) if i != t)
+
+
+def reconcile(headers, pending, arrived=(), loaded_at=None):
+    """``pending`` entries still waiting after a load started at ``loaded_at``
+    that brought the new sheet rows ``arrived``."""
+    if loaded_at is not None:
+        pending = [e for e in pending if e[0] >= loaded_at]
+    if not pending or not arrived:
+        return pending
+    left = {}
+    for r in arrived:
+        k = row_key(headers, r)
+        left[k] = left.get(k, 0) + 1
+    out = []
+    for e in pending:
+        k = row_key(headers, e[1])
+        if left.get(k):
+            left[k] -= 1
+        else:
+            out.append(e)
+    return out
+
+
+class PendingLoader:
+    """Snapshot loader serving ``loader()`` rows plus the pushed rows still pending."""
+
+    def __init__(self, loader):
+        self.loader = loader
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        self.pending = []       # [(pushed_at, row), ...]
+        self._base = None       # loader rows the served list was built from
+        self._served = None     # last list handed out (the snapshot appends pushes to it)
+        self._stale = False
+
+    def mark_dirty(self):
+        self.loader.mark_dirty()
+
+    def push(self, row, served):
+        """Record a pushed ``row``, already appended to the snapshot list ``served``."""
+        with self._lock:
+            self.pending = self.pending + [(time.time(), row)]
+            if served is not self._served:
+                self._stale = True  # not our list: rebuild it on the next load
+
+    def __call__(self):
+        started = time.time()
+        headers, rows = self.loader()
+        with self._lock:
+            base, before = self._base, len(self.pending)
+            arrived = ()
+            if rows is not base and base is not None and not getattr(self.loader, 'last_full', True):
+                arrived = rows[len(base):]
+            self.pending = reconcile(headers, self.pending, arrived, started)
+            if rows is not base or len(self.pending) != before or self._stale or self._served is None:
+                # Always a new list, never the loader's own: ingest appends to it in place.
+                self._served = rows + [r for _, r in self.pending]
+                self._base = rows
+                self._stale = False
+            return headers, self._served
@@ -0,0 +1,114 @@
+"""Daily rollup buckets per Puskesmas for filtered dashboard queries.
+
+Each bucket holds, for one (Puskesmas, day), the per-question score sums and
+counts plus the number of responses.  A query for a clinic and/or date range
+only merges the buckets it covers (found with ``bisect`` on the sorted days),
+so its cost depends on the number of buckets, not on the number of rows.
+Rows without a parseable timestamp land in a ``None`` day bucket that is
+only included when no date filter is given.
+"""
+from bisect import bisect_left, bisect_right
+from datetime import datetime
+from functools import lru_cache
+
+from .aggregate import (
+    Aggregate, NO_NAME, map_score, get_question_columns, get_puskesmas_index, get_timestamp_index
+)
+from .config import TIMESTAMP_FORMATS
+
+_DAY_FORMATS = list(dict.fromkeys(f.split()[0] for f in TIMESTAMP_FORMATS))
+
+
+@lru_cache(maxsize=4096)
+def parse_day(token):
+    """Date part of a form timestamp (``"17/10/2025"``) -> ``date`` or None."""
+    for fmt in _DAY_FORMATS:
+        try:
+            return datetime.strptime(token, fmt).date()
+        except ValueError:
+            continue
+    return None
+
+
+class DailyRollup:
+    def __init__(self, headers):
+        self.headers = headers
+        self.qcols = get_question_columns(headers)
+        self.p_idx = get_puskesmas_index(headers)
+        self.t_idx = get_timestamp_index(headers)
+        # name -> {day: [sums, counts, n]}
+        self.buckets = {}
+        self._days = {}
+
+    def add_rows(self, rows):
+        pairs = list(enumerate(self.qcols))
+        nq = len(pairs)
+        p, t = self.p_idx, self.t_idx
+        score = map_score
+        for r in rows:
+            name = (r[p] if p < len(r) and r[p].strip() else NO_NAME) if p is not None else NO_NAME
+            day = None
+            if t is not None and t < len(r):
+                token = r[t].strip().split(' ', 1)[0]
+                day = parse_day(token) if token else None
+            days = self.buckets.get(name)
+            if days is None:
+                days = self.buckets[name] = {}
+            b = days.get(day)
+            if b is None:
+                b = days[day] = [[0.0] * nq, [0] * nq, 0]
+                self._days.pop(name, None)
+            b[2] += 1
+            sums, counts = b[0], b[1]
+            for j, c in pairs:
+                if c < len(r):
+                    s = score(r[c])
+                    if s > 0:
+                        sums[j] += s
+                        counts[j] += 1
+        return self
+
+    def add_row(self, r):
+        return self.add_rows((r,))
+
+    def _sorted_days(self, name):
+        days = self._days.get(name)
+        if days is None:
+            days = self._days[name] = sorted(d for d in self.buckets[name] if d is not None)
+        return days
+
+    def bucket_count(self):
+        return sum(len(d) for d in self.buckets.values())
+
+    def query(self, puskesmas=None, date_from=None, date_to=None):
+        """Merge the covered buckets into an ``Aggregate`` (same read API)."""
+        result = Aggregate(self.headers)
+        names = [puskesmas] if puskesmas is not None else list(self.buckets)
+        dated = date_from is not None or date_to is not None
+        sums, counts = result.sums, result.counts
+        for name in names:
+            days = self.buckets.get(name)
+            if not days:
+                continue
+            if dated:
+                ordered = self._sorted_days(name)
+                lo = bisect_left(ordered, date_from) if date_from is not None else 0
+                hi = bisect_right(ordered, date_to) if date_to is not None else len(ordered)
+                selected = [days[d] for d in ordered[lo:hi]]
+            else:
+                selected = list(days.values())
+            if not selected:
+                continue
+            g = [[0.0] * len(sums), [0] * len(sums), 0]
+            if self.p_idx is not None:
+                result.groups[name] = g
+            for b in selected:
+                g[2] += b[2]
+                for j in range(len(sums)):
+                    g[0][j] += b[0][j]
+                    g[1][j] += b[1][j]
+            for j in range(len(sums)):
+                sums[j] += g[0][j]
+                counts[j] += g[1][j]
+            result.n_rows += g[2]
+        return result
@@ -0,0 +1,168 @@
+"""Single entry point for every Google Sheets API call.
+
+``SheetsScheduler.call`` does three things:
+  * coalesces concurrent identical reads (same ``key``) into one in-flight call,
+  * spends one token from a per-minute token bucket before each attempt so the
+    worker stays under the Sheets quota instead of collecting HTTP 429s,
+  * retries 429/5xx and connection errors with jittered exponential backoff.
+
+Writes (``key=None``) are only retried on 429: a quota rejection is never
+applied, whereas a timeout, dropped connection or 5xx may arrive after the
+server already ran the request -- resending a ``deleteDimension`` would then
+delete whichever row has shifted into its place.
+"""
+import random
+import threading
+import time
+
+import requests
+from gspread.exceptions import APIError
+
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+
+def error_status(exc):
+    """HTTP status of a gspread ``APIError`` (None for other exceptions)."""
+    if isinstance(exc, APIError):
+        return getattr(getattr(exc, 'response', None), 'status_code', None)
+    return None
+
+
+def is_retryable(exc, write=False):
+    if write:
+        return error_status(exc) == 429
+    if isinstance(exc, (requests.ConnectionError, requests.Timeout)):
+        return True
+    return error_status(exc) in RETRY_STATUSES
+
+
+class TokenBucket:
+    """Blocking token bucket: ``rate_per_minute`` tokens, refilled continuously."""
+
+    def __init__(self, rate_per_minute, capacity=None, clock=time.monotonic, sleep=time.sleep):
+        self.rate = rate_per_minute / 60.0
+        self.capacity = float(capacity if capacity is not None else rate_per_minute)
+        self._tokens = self.capacity
+        self._clock = clock
+        self._sleep = sleep
+        self._stamp = clock()
+        self._lock = threading.Lock()
+
+    def _refill(self):
+        now = self._clock()
+        self._tokens = min(self.capacity, self._tokens + (now - self._stamp) * self.rate)
+        self._stamp = now
+
+    def acquire(self):
+        if self.rate <= 0:
+            return 0.0
+        waited = 0.0
+        while True:
+            with self._lock:
+                self._refill()
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return waited
+                delay = (1 - self._tokens) / self.rate
+            self._sleep(delay)
+            waited += delay
+
+    def available(self):
+        with self._lock:
+            self._refill()
+            return self._tokens
+
+
+class _InFlight:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+        self.waiters = 0
+
+
+class SheetsScheduler:
+    def __init__(self, per_minute, max_retries=4, backoff_base=0.5, backoff_max=16.0,
+                 sleep=time.sleep, rand=random.uniform):
+        self.bucket = TokenBucket(per_minute, sleep=sleep)
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self._sleep = sleep
+        self._rand = rand
+        self._lock = threading.Lock()
+        self._inflight = {}
+        self.calls = 0
+        self.coalesced = 0
+        self.retries = 0
+        self.throttled = 0
+        self.failures = 0
+        self.errors_by_status = {}
+
+    def call(self, key, fn, *args, **kwargs):
+        """Run ``fn`` under the scheduler.
+
+        Calls sharing a non-None ``key`` while one is in flight wait for and
+        share its result.  Writes must pass ``key=None`` (retried on 429 only).
+        """
+        if key is None:
+            return self._run(fn, args, kwargs, write=True)
+        with self._lock:
+            flight = self._inflight.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._inflight[key] = _InFlight()
+            else:
+                flight.waiters += 1
+                self.coalesced += 1
+        if not leader:
+            flight.done.wait()
+            if flight.error is not None:
+                raise flight.error
+            return flight.result
+        try:
+            flight.result = self._run(fn, args, kwargs)
+            return flight.result
+        except Exception as e:
+            flight.error = e
+            raise
+        finally:
+            with self._lock:
+                self._inflight.pop(key, None)
+            flight.done.set()
+
+    def backoff(self, attempt):
+        return self._rand(0, min(self.backoff_max, self.backoff_base * (2 ** attempt)))
+
+    def _run(self, fn, args, kwargs, write=False):
+        attempt = 0
+        while True:
+            if self.bucket.acquire() > 0:
+                self.throttled += 1
+            self.calls += 1
+            try:
+                return fn(*args, **kwargs)
+            except Exception as e:
+                status = error_status(e)
+                if status is not None:
+                    with self._lock:
+                        self.errors_by_status[status] = self.errors_by_status.get(status, 0) + 1
+                if attempt >= self.max_retries or not is_retryable(e, write):
+                    self.failures += 1
+                    raise
+                self._sleep(self.backoff(attempt))
+                self.retries += 1
+                attempt += 1
+
+    def stats(self):
+        return {
+            'calls': self.calls,
+            'coalesced': self.coalesced,
+            'retries': self.retries,
+            'throttled': self.throttled,
+            'failures': self.failures,
+            'errors_by_status': dict(self.errors_by_status),
+            'in_flight': len(self._inflight),
+            'tokens_available': round(self.bucket.available(), 2),
+            'per_minute': self.bucket.rate * 60,
+        }
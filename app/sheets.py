@@ -1,114 +1,441 @@
-import gspread
-from oauth2client.service_account import ServiceAccountCredentials
 from gspread.utils import rowcol_to_a1
 from .config import (
-    SPREADSHEET_ID, WORKSHEET_NAME, META_COLUMNS_OFFSET,
-    EXCLUDE_COLUMNS_BY_NAME, EXCLUDE_COLUMNS_BY_QUESTION,
-    SCORE_MAP, EVALUATION_THRESHOLD
+    SPREADSHEET_ID, WORKSHEET_NAME, CACHE_TTL, CACHE_STALE_TTL,
+    SHEETS_QUOTA_PER_MINUTE, SHEETS_MAX_RETRIES, SYNC_MODE, FULL_RELOAD_SECONDS,
+    USE_NUMPY, COLUMNAR_MIN_ROWS, MIRROR_PATH, MIRROR_SYNC_SECONDS,
+    SHEETS_RETRY_SECONDS, SHEETS_POOL_SIZE, SOURCES, SOURCES_MAX_WORKERS
 )
-import os, json
-try:
-    from service_account_info import SERVICE_ACCOUNT_INFO  # type: ignore
-except Exception:  # pragma: no cover
-    SERVICE_ACCOUNT_INFO = {}
-
-_init_error = None
-_sheet = None
-
-SCOPE = [
-    "https://spreadsheets.google.com/feeds",
-    "https://www.googleapis.com/auth/drive"
-]
-
-try:
-    sa_info = SERVICE_ACCOUNT_INFO
-    if (not sa_info or not sa_info.get("private_key")):
-        env_json = os.getenv("CERIA_SKM_SERVICE_ACCOUNT_JSON")
-        if env_json:
-            try:
-                sa_info = json.loads(env_json)
-            except json.JSONDecodeError as je:  # pragma: no cover
-                _init_error = je
-    if sa_info and sa_info.get("private_key"):
-        creds = ServiceAccountCredentials.from_json_keyfile_dict(sa_info, SCOPE)
-        gc = gspread.authorize(creds)
-        sh = gc.open_by_key(SPREADSHEET_ID)
-        _sheet = sh.worksheet(WORKSHEET_NAME)
-    else:
-        _init_error = RuntimeError("SERVICE_ACCOUNT_INFO belum diisi.")
-except Exception as e:  # pragma: no cover
-    _init_error = e
+from .cache import SnapshotCache
+from .aggregate import (  # noqa: F401 - re-exported for views / scripts
+    NO_NAME, aggregate, get_question_columns, get_puskesmas_index, get_timestamp_index,
+    map_score, parse_timestamp, remark
+)
+from .scheduler import SheetsScheduler, error_status
+from .client import SheetsClient
+from .sources import MergedLoader, parse_sources
+from .mirror import SheetMirror, MirrorReader, MirrorSync
+from .pending import PendingLoader
+from .rollup import DailyRollup
+from . import columnar
+from .metrics import phase, registry
+import hashlib, threading, time
+from bisect import bisect_left
+from datetime import datetime, timedelta, timezone
+
+# Lazy: no network call until the first request needs the sheet.
+_clients = [SheetsClient(sid, ws, retry_seconds=SHEETS_RETRY_SECONDS, pool_size=SHEETS_POOL_SIZE)
+            for sid, ws in parse_sources(SOURCES, SPREADSHEET_ID, WORKSHEET_NAME)]
+_client = _clients[0]
 
 
 def get_sheet():
-    if not _sheet:
-        raise RuntimeError(f"Tidak bisa akses Google Sheets: {_init_error}")
-    return _sheet
+    return _client.worksheet()
 
 
-def fetch_all():
-    sheet = get_sheet()
-    data = sheet.get_all_values()
+def client_state():
+    state = _client.state()
+    if len(_clients) > 1:
+        state['sources'] = [dict(c.state(), spreadsheet_id=c.spreadsheet_id, worksheet=c.worksheet_name)
+                            for c in _clients]
+    return state
+
+
+def use_worksheet(ws, source=0):
+    """Replace a source's worksheet (e.g. with ``fakes.FakeWorksheet``) and drop the cache."""
+    _clients[source].use(ws)
+    _loader.reset()
+    if _pending is not None:
+        _pending.reset()
+    _cache.invalidate()
+
+
+scheduler = SheetsScheduler(SHEETS_QUOTA_PER_MINUTE, max_retries=SHEETS_MAX_RETRIES)
+
+
+def sheets_call(key, fn, *args, **kwargs):
+    """Run a Sheets API call through the shared scheduler (``key=None`` for writes)."""
+    try:
+        with phase('sheets'):
+            return scheduler.call(key, fn, *args, **kwargs)
+    except Exception as e:
+        if error_status(e) == 401:
+            for c in _clients:  # token/credentials no longer valid: re-authorize next time
+                c.reset(e)
+        raise
+
+
+def _load_from_sheet(client=None):
+    client = client or _client
+    sheet = client.worksheet()
+    data = sheets_call(('get_all_values', client.spreadsheet_id, client.worksheet_name),
+                       sheet.get_all_values)
     headers = data[0] if data else []
     rows = data[1:] if len(data) > 1 else []
     return headers, rows
 
 
-def get_question_columns(headers):
-    start = META_COLUMNS_OFFSET if META_COLUMNS_OFFSET is not None else 0
-    indices = list(range(start, len(headers)))
-    lower_exclude = {n.lower() for n in EXCLUDE_COLUMNS_BY_NAME}
-    lower_ex_q = {n.lower() for n in EXCLUDE_COLUMNS_BY_QUESTION}
-    if headers and headers[-1].strip().lower() in lower_exclude:
-        indices.pop(-1)
-    filtered = []
-    for i in indices:
-        name = headers[i].strip().lower()
-        if name in lower_exclude or name in lower_ex_q:
-            continue
-        filtered.append(i)
-    return filtered
-
-
-def map_score(val: str) -> float:
-    v = val.strip().lower()
-    try:
-        return float(v)
-    except ValueError:
-        return SCORE_MAP.get(v, 0.0)
+def headers_hash(headers):
+    return hashlib.sha1("\x1f".join(headers).encode('utf-8')).hexdigest()
+
+
+def _trim(row):
+    """``row`` without trailing empty cells (the API omits them)."""
+    end = len(row)
+    while end and row[end - 1] == '':
+        end -= 1
+    return row[:end]
+
+
+class IncrementalLoader:
+    """Append-only sync for the Google Form response sheet.
+
+    After one full load only the whole header row (``1:1``) and the rows from
+    the last known row on (``A{n+1}:<last col>``) are fetched, in a single
+    ``batch_get``.  A full reload happens when the header row changes (including
+    a column added on the right, whose answers the tail range would miss), when
+    the last known row is no longer where it was (rows edited or deleted, also
+    by another gunicorn worker), after this worker's own edits (``mark_dirty``),
+    or every ``full_reload_seconds`` to catch other manual edits in the sheet.
+    """
+
+    def __init__(self, client=None, full_reload_seconds=FULL_RELOAD_SECONDS, enabled=True):
+        self.client = client or _client
+        self.full_reload_seconds = full_reload_seconds
+        self.enabled = enabled
+        self._lock = threading.Lock()
+        self.full_loads = 0
+        self.incremental_loads = 0
+        self.appended_rows = 0
+        self.reset()
+
+    def reset(self):
+        self.last_full = True
+        self.headers = None
+        self.rows = None
+        self.header_hash = None
+        self._dirty = False
+        self._full_at = 0.0
+
+    def mark_dirty(self):
+        self._dirty = True
+
+    def __call__(self):
+        with self._lock:
+            if (not self.enabled or self.rows is None or self._dirty or not self.headers
+                    or time.monotonic() - self._full_at > self.full_reload_seconds):
+                return self._full()
+            return self._append()
+
+    def _full(self):
+        self._dirty = False
+        self.last_full = True
+        headers, rows = _load_from_sheet(self.client)
+        self.headers, self.rows = headers, rows
+        self.header_hash = headers_hash(_trim(headers))
+        self._full_at = time.monotonic()
+        self.full_loads += 1
+        return headers, rows
+
+    def _append(self):
+        sheet = self.client.worksheet()
+        width = len(self.headers)
+        # Start at the last known row (+1 for the header) as an anchor: if it moved,
+        # rows above it were deleted or it was edited, and the offset is stale.
+        anchor = len(self.rows)
+        first_new = anchor + 1 if anchor else 2
+        header_rng = '1:1'  # the whole row, not just the known width
+        tail_rng = a1_tail_range_for_headers(first_new, width)
+        head_vals, tail = sheets_call(('batch_get', self.client.spreadsheet_id,
+                                       self.client.worksheet_name, header_rng, tail_rng),
+                                      sheet.batch_get, [header_rng, tail_rng])
+        head = list(head_vals[0]) if head_vals else []
+        if headers_hash(_trim(head)) != self.header_hash:
+            return self._full()
+        if anchor:
+            if not tail or _trim(list(tail[0])) != _trim(self.rows[-1]):
+                return self._full()
+            tail = tail[1:]
+        self.last_full = False
+        self.incremental_loads += 1
+        if tail:
+            new_rows = [list(r) + [''] * (width - len(r)) for r in tail]
+            self.rows = self.rows + new_rows
+            self.appended_rows += len(new_rows)
+        return self.headers, self.rows
+
+    def stats(self):
+        return {
+            'mode': 'incremental' if self.enabled else 'full',
+            'full_loads': self.full_loads,
+            'incremental_loads': self.incremental_loads,
+            'appended_rows': self.appended_rows,
+        }
+
+
+_source_loaders = [IncrementalLoader(c, enabled=SYNC_MODE != 'full') for c in _clients]
+_loader = (_source_loaders[0] if len(_source_loaders) == 1
+           else MergedLoader(_source_loaders, SOURCES_MAX_WORKERS))
+_mirror = SheetMirror(MIRROR_PATH) if MIRROR_PATH else None
+_mirror_sync = MirrorSync(_mirror, _loader, MIRROR_SYNC_SECONDS) if _mirror else None
+
+
+def _load_from_mirror():
+    if _mirror.synced_at() is None:
+        # Empty mirror (first start): fill it once before serving.
+        _mirror_sync.sync_once()
+    return _mirror_reader()
+
+
+if _mirror is not None:
+    _mirror_reader = MirrorReader(_mirror)
+    _pending = None     # pushed rows are kept in the mirror (shared by all workers)
+    _cache = SnapshotCache(_load_from_mirror, CACHE_TTL, CACHE_STALE_TTL)
+else:
+    _pending = PendingLoader(_loader)
+    _cache = SnapshotCache(_pending, CACHE_TTL, CACHE_STALE_TTL)
+
+
+def start_background_sync():
+    """Start the mirror sync thread (no-op when the mirror is disabled)."""
+    if _mirror_sync is not None:
+        _mirror_sync.start()
+
+
+def get_mirror():
+    return _mirror
+
+
+def get_loader():
+    """The snapshot loader (``MergedLoader`` when several sources are configured)."""
+    return _loader
+
+
+def data_age():
+    """Seconds since the served data was last synced from Google Sheets.
+
+    Runs after every response, so it never touches SQLite: with the mirror the
+    sync time is the one seen when the snapshot was last (re)loaded.
+    """
+    if _mirror is not None:
+        synced = _mirror_reader.synced_at
+        return time.time() - synced if synced else None
+    snap = _cache._snapshot
+    return snap.age() if snap else None
+
+
+def get_snapshot():
+    """Cached snapshot of the worksheet; rows are shared, do not mutate them."""
+    return _cache.get()
+
+
+def fetch_all():
+    snap = _cache.get()
+    return snap.headers, snap.rows
+
+
+def invalidate_cache():
+    """Call after the app changed or removed rows: forces a full reload."""
+    _loader.mark_dirty()
+    if _mirror_sync is not None:
+        _mirror_sync.sync_once()
+    _cache.invalidate()
+
+
+def cache_stats():
+    stats = _cache.stats()
+    stats['sync'] = _loader.stats()
+    if _mirror_sync is not None:
+        stats['mirror'] = _mirror_sync.stats()
+    return stats
+
+
+def _collect_metrics():
+    """Cumulative counters of the scheduler, cache and loader for /metrics."""
+    sch = scheduler.stats()
+    for name in ('calls', 'coalesced', 'retries', 'throttled', 'failures'):
+        yield f'ceria_sheets_{name}_total', {}, sch[name]
+    for status, count in sch['errors_by_status'].items():
+        yield 'ceria_sheets_errors_total', {'status': status}, count
+    cache = _cache.stats()
+    for name in ('hits', 'stale_hits', 'misses', 'refreshes', 'errors'):
+        yield 'ceria_cache_events_total', {'event': name}, cache[name]
+    sync = _loader.stats()
+    yield 'ceria_sheet_loads_total', {'kind': 'full'}, sync['full_loads']
+    yield 'ceria_sheet_loads_total', {'kind': 'incremental'}, sync['incremental_loads']
+    yield 'ceria_rows_processed_total', {'stage': 'sync_append'}, sync['appended_rows']
+
+
+registry.add_collector(_collect_metrics)
+registry.describe('ceria_sheets_calls_total', 'counter', 'Panggilan Google Sheets API (termasuk retry)')
+registry.describe('ceria_sheets_errors_total', 'counter', 'Error Google Sheets API per status HTTP (429 = kuota)')
+registry.describe('ceria_cache_events_total', 'counter', 'Cache snapshot: hit, stale hit, miss, refresh, error')
+
+
+def _use_columnar(n_rows):
+    if USE_NUMPY in ('0', 'false', 'no', 'off') or not columnar.available():
+        return False
+    return USE_NUMPY != 'auto' or n_rows >= COLUMNAR_MIN_ROWS
+
+
+def build_aggregate(headers, rows):
+    """NumPy ``ScoreMatrix`` for large snapshots, pure-Python ``Aggregate`` otherwise."""
+    registry.inc('ceria_rows_processed_total', len(rows), stage='aggregate')
+    with phase('aggregate'):
+        if _use_columnar(len(rows)):
+            matrix = columnar.ScoreMatrix.build(headers, rows)
+            if matrix is not None:
+                return matrix
+        return aggregate(headers, rows)
+
+
+def get_aggregate(snap=None):
+    """Aggregate of the current snapshot, computed once per snapshot."""
+    snap = snap or _cache.get()
+    return snap.memo('aggregate', lambda: build_aggregate(snap.headers, snap.rows))
+
+
+def get_rollup(snap=None):
+    """Daily per-Puskesmas rollup buckets of the current snapshot."""
+    snap = snap or _cache.get()
+
+    def build():
+        registry.inc('ceria_rows_processed_total', len(snap.rows), stage='rollup')
+        with phase('aggregate'):
+            return DailyRollup(snap.headers).add_rows(snap.rows)
+    return snap.memo('rollup', build)
+
+
+class _RunningHash:
+    """Content hash of headers + rows that can be extended row by row."""
+
+    def __init__(self, headers, rows):
+        self._h = hashlib.sha1("\x1f".join(headers).encode('utf-8'))
+        self.count = 0
+        for r in rows:
+            self.add_row(r)
+
+    def add_row(self, r):
+        self._h.update(b"\x1e")
+        self._h.update("\x1f".join(r).encode('utf-8'))
+        self.count += 1
+
+    def version(self):
+        return f"{self.count}-{self._h.hexdigest()[:20]}"
+
+
+def get_data_version(snap=None):
+    """Stable data-version fingerprint: row count + content hash of the snapshot."""
+    snap = snap or _cache.get()
+    return snap.memo('fingerprint', lambda: _RunningHash(snap.headers, snap.rows)).version()
+
+
+def get_last_modified(snap=None):
+    """UTC datetime of the last change of ``snap``'s data, or None.
+
+    Only the mirror records change times shared by all workers; without it
+    each worker would answer with its own time, so callers rely on the ETag.
+    """
+    if _mirror is None:
+        return None
+    snap = snap or _cache.get()
+    at = _mirror_reader.last_modified(snap.rows)
+    return datetime.fromtimestamp(int(at), tz=timezone.utc) if at else None
+
+
+def ingest_row(values):
+    """Append one pushed form response to the live snapshot (and mirror).
+
+    Aggregates, rollups and the data version are updated in O(questions);
+    nothing is read from Google Sheets.  The row stays pending (``app.pending``)
+    until the loader reads it from the sheet, so it never shifts the sync offset.
+    """
+    snap = _cache.get()
+    width = len(snap.headers)
+    row = [str(v) for v in values[:width]] + [''] * (width - len(values))
+    snap = _cache.append(row)
+    if _mirror is not None:
+        _mirror_reader.accept(_mirror.push_pending(row), snap.rows)
+    else:
+        _pending.push(row, snap.rows)
+    registry.inc('ceria_rows_processed_total', 1, stage='ingest')
+    return len(snap.rows)
+
+
+def _puskesmas_row_index(snap):
+    p = get_puskesmas_index(snap.headers)
+    index = {}
+    if p is not None:
+        for i, r in enumerate(snap.rows):
+            key = r[p] if p < len(r) and r[p].strip() else NO_NAME
+            index.setdefault(key, []).append(i)
+    return index
+
+
+def _row_days(snap):
+    t = get_timestamp_index(snap.headers)
+    days = []
+    for r in snap.rows:
+        ts = parse_timestamp(r[t]) if t is not None and t < len(r) else None
+        days.append(ts.date() if ts else None)
+    return days
+
+
+def _filter_rows(snap, start, puskesmas, date_from, date_to):
+    """Indices from ``start`` on matching the Puskesmas / date filters, in memory."""
+    if puskesmas:
+        rows = snap.memo('puskesmas_rows', lambda: _puskesmas_row_index(snap)).get(puskesmas, [])
+        rows = rows[bisect_left(rows, start):]
+    else:
+        rows = range(start, len(snap.rows))
+    if date_from or date_to:
+        days = snap.memo('row_days', lambda: _row_days(snap))
+        rows = [i for i in rows if days[i] is not None
+                and (date_from is None or days[i] >= date_from)
+                and (date_to is None or days[i] <= date_to)]
+    return rows
+
+
+def _indexed_rows(snap, puskesmas, date_from, date_to):
+    """Filter matches from the mirror's Puskesmas / timestamp indexes (None if unusable)."""
+    if _mirror is None:
+        return None
+    found = _mirror_reader.rownums(
+        snap.rows, puskesmas or None,
+        date_from.isoformat() if date_from else None,
+        (date_to + timedelta(days=1)).isoformat() if date_to else None)
+    if found is None:
+        return None  # the snapshot is not the mirror's current state
+    indices, n = found
+    # Rows after the mirrored ones are pushed rows still pending.
+    return indices + list(_filter_rows(snap, n, puskesmas, date_from, date_to))
+
+
+def search_rows(snap, q=None, puskesmas=None, date_from=None, date_to=None):
+    """Indices (0-based) into ``snap.rows`` of rows matching every word of ``q``,
+    the Puskesmas and the date range (``datetime.date``, inclusive).
+
+    Takes the caller's snapshot so the indices always refer to the rows it renders.
+    With the mirror, the Puskesmas / date filters use its SQLite indexes.
+    """
+    candidates = range(len(snap.rows))
+    if puskesmas or date_from or date_to:
+        candidates = _indexed_rows(snap, puskesmas, date_from, date_to)
+        if candidates is None:
+            candidates = _filter_rows(snap, 0, puskesmas, date_from, date_to)
+    terms = (q or '').lower().split()
+    if not terms:
+        return list(candidates)
+    text = snap.memo('search_text', lambda: ["\x1f".join(r).lower() for r in snap.rows])
+    return [i for i in candidates if all(t in text[i] for t in terms)]
 
 
 def compute_averages(headers, rows):
-    qcols = get_question_columns(headers)
-    sums = [0.0] * len(qcols)
-    cnts = [0] * len(qcols)
-    for r in rows:
-        for j, c in enumerate(qcols):
-            if c < len(r):
-                s = map_score(r[c])
-                if s > 0:
-                    sums[j] += s
-                    cnts[j] += 1
-    avgs = [(sums[i] / cnts[i] if cnts[i] else 0.0) for i in range(len(qcols))]
-    labels = [headers[i] for i in qcols]
-    overall = sum(avgs) / len(avgs) if avgs else 0.0
-    return labels, avgs, overall
+    agg = aggregate(headers, rows)
+    return agg.labels, agg.averages, agg.overall
 
 
 def compute_group_overall(headers, rows):
-    try:
-        idx = next(i for i, h in enumerate(headers) if h.strip().lower() == "puskesmas")
-    except StopIteration:
-        return []
-    groups = {}
-    for r in rows:
-        key = r[idx] if idx < len(r) and r[idx].strip() else "<Tanpa Nama>"
-        groups.setdefault(key, []).append(r)
-    summary = []
-    for key in sorted(groups):
-        _, _, ov = compute_averages(headers, groups[key])
-        summary.append((key, ov))
-    return summary
+    return aggregate(headers, rows).grouped()
 
 
 def a1_row_range_for_headers(row_idx, headers_len):
@@ -116,12 +443,7 @@ def a1_row_range_for_headers(row_idx, headers_len):
     return f"A{row_idx}:{last_col}{row_idx}"
 
 
-def get_puskesmas_index(headers):
-    try:
-        return next(i for i, h in enumerate(headers) if h.strip().lower() == "puskesmas")
-    except StopIteration:
-        return None
-
-
-def remark(avg: float) -> str:
-    return "Evaluasi Diperlukan" if avg < EVALUATION_THRESHOLD else "OK"
+def a1_tail_range_for_headers(start_row, headers_len):
+    """Open-ended range from ``start_row`` to the last data row (``A10:L``)."""
+    last_col = rowcol_to_a1(1, headers_len)[:-1]
+    return f"A{start_row}:{last_col}"
@@ -0,0 +1,154 @@
+"""Several spreadsheets / worksheets merged into one dataset.
+
+``CERIA_SKM_SOURCES`` lists the sources (``<spreadsheet_id>:<worksheet>``,
+separated by ``;`` or new lines; without ``<spreadsheet_id>:`` the default
+spreadsheet is used).  ``MergedLoader`` runs one ``IncrementalLoader`` per
+source on a bounded thread pool, so a refresh takes about as long as the
+slowest source, and merges the results:
+
+* columns are aligned by header name (case/whitespace-insensitive); a header
+  missing from a source stays empty for its rows, and a header only some
+  sources have is inserted after its predecessor in that source;
+* rows are concatenated in source order, and ``origin(rownum)`` maps a merged
+  row back to ``(source, row in that source)`` so edits and deletes reach the
+  right worksheet (``writes.MergedWriteBatch``).
+
+The first ``META_COLUMNS_OFFSET`` columns are still positional, so all
+sources should share the same metadata columns.
+"""
+import re
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+
+def parse_sources(spec, default_spreadsheet_id, default_worksheet):
+    """``[(spreadsheet_id, worksheet_name), ...]`` from the ``CERIA_SKM_SOURCES`` value."""
+    sources = []
+    for item in re.split(r'[;\n]', spec or ''):
+        item = item.strip()
+        if not item:
+            continue
+        sid, sep, ws = item.partition(':')
+        sources.append((sid.strip(), ws.strip()) if sep else (default_spreadsheet_id, item))
+    return sources or [(default_spreadsheet_id, default_worksheet)]
+
+
+def _header_keys(headers):
+    """Alignment key per column: normalized name + occurrence (duplicate titles)."""
+    seen = {}
+    keys = []
+    for h in headers:
+        name = ' '.join(h.split()).lower()
+        n = seen.get(name, 0)
+        seen[name] = n + 1
+        keys.append((name, n))
+    return keys
+
+
+def merge_headers(header_lists):
+    """Merged headers plus, per source, the merged index of each of its columns."""
+    merged, merged_keys = [], []
+    for headers in header_lists:
+        prev = -1
+        for h, key in zip(headers, _header_keys(headers)):
+            if key in merged_keys:
+                prev = merged_keys.index(key)
+                continue
+            prev += 1
+            merged.insert(prev, h)
+            merged_keys.insert(prev, key)
+    position = {key: i for i, key in enumerate(merged_keys)}
+    colmaps = [[position[key] for key in _header_keys(headers)] for headers in header_lists]
+    return merged, colmaps
+
+
+class MergedLoader:
+    def __init__(self, loaders, max_workers=4):
+        self.loaders = loaders
+        self._pool = ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(loaders))),
+                                        thread_name_prefix='sheets-source')
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        for loader in self.loaders:
+            loader.reset()
+        self.last_full = True
+        self.headers = None
+        self.rows = None
+        self.colmaps = []
+        self._parts = None      # (headers, rows) per source used for the current merge
+        self._starts = []       # merged row index where each source begins
+
+    def mark_dirty(self):
+        for loader in self.loaders:
+            loader.mark_dirty()
+
+    def __call__(self):
+        with self._lock:
+            parts = list(self._pool.map(lambda loader: loader(), self.loaders))
+            prev = self._parts
+            if prev is not None and all(h is ph and r is pr for (h, r), (ph, pr) in zip(parts, prev)):
+                self.last_full = False
+                return self.headers, self.rows
+            header_lists = [h for h, _ in parts]
+            same_headers = prev is not None and all(h is ph for h, (ph, _) in zip(header_lists, prev))
+            grew_last_only = (same_headers
+                              and all(r is pr for (_, r), (_, pr) in zip(parts[:-1], prev[:-1]))
+                              and not self.loaders[-1].last_full)
+            if grew_last_only:
+                # Only the last source got new rows: append them (mirror can apply incrementally).
+                tail = parts[-1][1][len(prev[-1][1]):]
+                self.rows = self.rows + [self._to_merged(len(parts) - 1, r) for r in tail]
+                self.last_full = False
+            else:
+                if not same_headers:
+                    self.headers, self.colmaps = merge_headers(header_lists)
+                rows, starts = [], []
+                for i, (_, src_rows) in enumerate(parts):
+                    starts.append(len(rows))
+                    rows.extend(self._to_merged(i, r) for r in src_rows)
+                self.rows, self._starts = rows, starts
+                self.last_full = True
+            self._parts = parts
+            return self.headers, self.rows
+
+    def _to_merged(self, src, row):
+        out = [''] * len(self.headers)
+        for value, m in zip(row, self.colmaps[src]):
+            out[m] = value
+        return out
+
+    def to_merged(self, src, row):
+        """A row of source ``src`` in merged column order."""
+        return self._to_merged(src, row)
+
+    def to_source(self, src, values):
+        """Merged-order ``values`` in the column order of source ``src``."""
+        return [values[m] if m < len(values) else '' for m in self.colmaps[src]]
+
+    def source_width(self, src):
+        """Number of columns of source ``src``."""
+        return len(self._parts[src][0])
+
+    def origin(self, rownum):
+        """``(source index, row number in that source)`` of merged data row ``rownum`` (1-based)."""
+        if self.rows is None:
+            self()
+        with self._lock:
+            for src in range(len(self._parts) - 1, -1, -1):
+                if rownum > self._starts[src]:
+                    local = rownum - self._starts[src]
+                    return (src, local) if local <= len(self._parts[src][1]) else None
+        return None
+
+    def stats(self):
+        per_source = [loader.stats() for loader in self.loaders]
+        return {
+            'mode': per_source[0]['mode'] if per_source else 'full',
+            'full_loads': sum(s['full_loads'] for s in per_source),
+            'incremental_loads': sum(s['incremental_loads'] for s in per_source),
+            'appended_rows': sum(s['appended_rows'] for s in per_source),
+            'sources': [dict(s, worksheet=loader.client.worksheet_name)
+                        for s, loader in zip(per_source, self.loaders)],
+        }
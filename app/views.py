@@ -1,19 +1,54 @@
-from flask import Blueprint, render_template, jsonify, request, redirect, url_for, flash, send_file, make_response
-import io, csv, time
+from flask import Blueprint, render_template, jsonify, request, redirect, url_for, flash, make_response, current_app, Response, g
+import io, time, hmac, hashlib, queue, threading
+from collections import OrderedDict
+from datetime import date
 from .config import (
-    FORM_URL, EVALUATION_THRESHOLD, WORKSHEET_NAME
+    FORM_URL, EVALUATION_THRESHOLD, WORKSHEET_NAME, MANAGE_PAGE_SIZE, MANAGE_MAX_PAGE_SIZE,
+    INGEST_TOKEN, LIVE_POLL_SECONDS, LIVE_MAX_CLIENTS, LIVE_HEARTBEAT_SECONDS,
+    CHART_WORKERS, CHART_CACHE_BYTES, CHART_TIMEOUT_SECONDS
 )
 from . import config
 from .sheets import (
-    fetch_all, compute_averages, compute_group_overall,
-    a1_row_range_for_headers, get_puskesmas_index, remark, get_sheet
+    get_aggregate, get_rollup, remark,
+    invalidate_cache, cache_stats, scheduler, data_age, get_snapshot, search_rows,
+    get_data_version, get_last_modified, client_state, ingest_row
 )
+from . import charts as chart_render
+from .exports import csv_response, not_modified, parquet_bytes
+from .live import DashboardBroadcaster
+from .metrics import phase, registry, server_timing
+from .writes import new_batch, row_hash
 
 bp = Blueprint('main', __name__)
 
+@bp.before_request
+def start_timer():
+    g.request_started = time.perf_counter()
+
+@bp.after_request
+def add_data_age(resp):
+    age = data_age()
+    if age is not None:
+        resp.headers['X-Data-Age'] = f"{age:.0f}"
+    return resp
+
+@bp.after_request
+def record_timing(resp):
+    total = time.perf_counter() - g.get('request_started', time.perf_counter())
+    resp.headers['Server-Timing'] = server_timing(total)
+    endpoint = request.url_rule.rule if request.url_rule else 'other'
+    registry.observe('ceria_request_duration_seconds', total, endpoint=endpoint)
+    registry.inc('ceria_requests_total', endpoint=endpoint, status=resp.status_code)
+    registry.start()  # per process, so also in workers forked from a preloaded app
+    return resp
+
+def _render(template, **context):
+    with phase('render'):
+        return render_template(template, **context)
+
 @bp.route('/')
 def index():
-    return render_template('index.html', form_url=FORM_URL, worksheet=WORKSHEET_NAME)
+    return _render('index.html', form_url=FORM_URL, worksheet=WORKSHEET_NAME)
 
 _qr_cache = {"png": None, "ts": 0}
 
@@ -36,84 +71,452 @@ def qr_code():
 
 @bp.route('/dashboard')
 def dashboard():
-    return render_template('dashboard.html')
+    return _render('dashboard.html')
 
-@bp.route('/api/dashboard-data')
-def dashboard_data():
-    headers, rows = fetch_all()
-    labels, avgs, overall = compute_averages(headers, rows)
-    grouped = compute_group_overall(headers, rows)
-    puskesmas_idx = get_puskesmas_index(headers)
-    puskesmas_values = []
-    if puskesmas_idx is not None:
-        names = {(r[puskesmas_idx] or '<Tanpa Nama>') for r in rows if len(r) > puskesmas_idx}
-        puskesmas_values = sorted(names)
-    return jsonify({
-        'labels': labels,
-        'averages': avgs,
+def _parse_date_arg(name):
+    raw = (request.args.get(name) or '').strip()
+    if not raw:
+        return None
+    return date.fromisoformat(raw)
+
+def _dashboard_payload(snap, puskesmas, date_from, date_to):
+    full = get_aggregate(snap)
+    if puskesmas is None and date_from is None and date_to is None:
+        agg = grouped_src = full
+    else:
+        rollup = get_rollup(snap)
+        grouped_src = rollup.query(None, date_from, date_to) if (date_from or date_to) else full
+        agg = rollup.query(puskesmas, date_from, date_to) if puskesmas is not None else grouped_src
+    overall = agg.overall
+    return {
+        'labels': agg.labels,
+        'averages': agg.averages,
         'overall': overall,
         'overall_remark': remark(overall),
-        'grouped': [ {'name': g[0], 'avg': g[1], 'remark': remark(g[1])} for g in grouped ],
+        'grouped': [ {'name': name, 'avg': avg, 'remark': remark(avg), 'count': grouped_src.group_count(name)}
+                     for name, avg in grouped_src.grouped() ],
         'threshold': EVALUATION_THRESHOLD,
-        'puskesmas_list': puskesmas_values
+        'puskesmas_list': full.puskesmas_list,
+        'responses': agg.n_rows,
+        'filter': {
+            'puskesmas': puskesmas,
+            'from': date_from.isoformat() if date_from else None,
+            'to': date_to.isoformat() if date_to else None,
+        },
+        'data_version': get_data_version(snap)
+    }
+
+# Serialized JSON per (data version, filter); small LRU shared by the worker's threads.
+_dashboard_json = OrderedDict()
+_dashboard_json_lock = threading.Lock()
+_DASHBOARD_JSON_MAX = 64
+
+@bp.route('/api/dashboard-data')
+def dashboard_data():
+    """Dashboard metrics; optional ``puskesmas``, ``from`` and ``to`` (YYYY-MM-DD) filters.
+
+    Answers ``If-None-Match`` (and, with the mirror's shared change time,
+    ``If-Modified-Since``) with 304 before any computation and reuses the
+    serialized body while the data version is unchanged.
+    """
+    puskesmas = (request.args.get('puskesmas') or '').strip() or None
+    if puskesmas == 'Semua':
+        puskesmas = None
+    try:
+        date_from, date_to = _parse_date_arg('from'), _parse_date_arg('to')
+    except ValueError:
+        return jsonify({'error': 'Format tanggal harus YYYY-MM-DD'}), 400
+    snap = get_snapshot()
+    version = get_data_version(snap)
+    last_modified = get_last_modified(snap)
+    etag = 'dash-' + version
+    cached = not_modified(etag, last_modified)
+    if cached is not None:
+        return cached
+    key = (version, puskesmas, date_from, date_to)
+    with _dashboard_json_lock:
+        body = _dashboard_json.get(key)
+        if body is not None:
+            _dashboard_json.move_to_end(key)
+    if body is None:
+        payload = _dashboard_payload(snap, puskesmas, date_from, date_to)
+        with phase('serialize'):
+            body = current_app.json.dumps(payload).encode('utf-8')
+        with _dashboard_json_lock:
+            _dashboard_json[key] = body
+            while len(_dashboard_json) > _DASHBOARD_JSON_MAX:
+                _dashboard_json.popitem(last=False)
+    resp = Response(body, mimetype='application/json')
+    resp.set_etag(etag)
+    if last_modified:
+        resp.last_modified = last_modified
+    resp.headers['Cache-Control'] = 'no-cache'
+    return resp
+
+def _live_payload():
+    snap = get_snapshot()
+    return get_data_version(snap), _dashboard_payload(snap, None, None, None)
+
+live = DashboardBroadcaster(_live_payload, LIVE_POLL_SECONDS, LIVE_MAX_CLIENTS)
+
+@bp.route('/api/dashboard-stream')
+def dashboard_stream():
+    """Server-Sent Events for the unfiltered dashboard.
+
+    Sends ``snapshot`` (same payload as /api/dashboard-data) on connect, then a
+    ``delta`` with only the changed averages / Puskesmas rows per data change.
+    Returns 503 when this worker already serves ``LIVE_MAX_CLIENTS`` streams;
+    the dashboard then falls back to polling.
+    """
+    sub = live.subscribe()
+    if sub is None:
+        return jsonify({'error': 'Terlalu banyak koneksi live'}), 503
+    q, first = sub
+    def events():
+        try:
+            yield b"retry: 5000\n" + first
+            while True:
+                try:
+                    frame = q.get(timeout=LIVE_HEARTBEAT_SECONDS)
+                except queue.Empty:
+                    yield b": ping\n\n"
+                    continue
+                if frame is None:
+                    return
+                yield frame
+        finally:
+            live.unsubscribe(q)
+    resp = Response(events(), mimetype='text/event-stream')
+    resp.headers['Cache-Control'] = 'no-cache'
+    resp.headers['X-Accel-Buffering'] = 'no'
+    return resp
+
+@bp.route('/healthz')
+def healthz():
+    """Liveness + connection state; never calls the Sheets API."""
+    state = client_state()
+    return jsonify({
+        'status': 'ok',
+        'sheets': state,
+        'data_age_seconds': data_age(),
+        'startup_seconds': current_app.config.get('STARTUP_SECONDS'),
     })
 
+@bp.route('/metrics')
+def metrics():
+    """Prometheus text format, summed over all workers when CERIA_SKM_METRICS_DIR is set."""
+    return Response(registry.render(), mimetype='text/plain; version=0.0.4')
+
+@bp.route('/api/cache-stats')
+def cache_stats_view():
+    stats = cache_stats()
+    stats['scheduler'] = scheduler.stats()
+    stats['live'] = live.stats()
+    stats['charts'] = charts.stats()
+    return jsonify(stats)
+
+def _int_arg(name, default, lo, hi):
+    try:
+        value = int(request.args.get(name, default))
+    except (TypeError, ValueError):
+        value = default
+    return max(lo, min(hi, value))
+
+def _row_filters():
+    """Puskesmas / ``from`` / ``to`` filters of /manage and the CSV export (bad dates ignored)."""
+    puskesmas = (request.args.get('puskesmas') or '').strip()
+    try:
+        date_from = _parse_date_arg('from')
+    except ValueError:
+        date_from = None
+    try:
+        date_to = _parse_date_arg('to')
+    except ValueError:
+        date_to = None
+    return puskesmas, date_from, date_to
+
+def _manage_page():
+    """One page of /manage rows for the current ``q`` / filter / ``page`` args."""
+    snap = get_snapshot()
+    q = (request.args.get('q') or '').strip()
+    puskesmas, date_from, date_to = _row_filters()
+    per_page = _int_arg('per_page', MANAGE_PAGE_SIZE, 1, MANAGE_MAX_PAGE_SIZE)
+    if q or puskesmas or date_from or date_to:
+        matches = search_rows(snap, q, puskesmas, date_from, date_to)
+    else:
+        matches = range(len(snap.rows))
+    total = len(matches)
+    pages = max(1, -(-total // per_page))
+    page = _int_arg('page', 1, 1, pages)
+    start = (page - 1) * per_page
+    width = len(snap.headers)
+    # rownum = nomor baris data (1-based, tanpa header), dipakai oleh /edit dan /delete
+    items = [{'rownum': i + 1, 'values': (snap.rows[i] + [''] * (width - len(snap.rows[i])))[:width],
+              'hash': row_hash(snap.rows[i], width)}
+             for i in matches[start:start + per_page]]
+    return {
+        'headers': snap.headers, 'rows': items, 'total': total,
+        'page': page, 'pages': pages, 'per_page': per_page,
+        'q': q, 'puskesmas': puskesmas,
+        'from': date_from.isoformat() if date_from else '',
+        'to': date_to.isoformat() if date_to else '',
+    }
+
 @bp.route('/manage')
 def manage():
-    headers, rows = fetch_all()
-    return render_template('manage.html', headers=headers, rows=rows)
+    data = _manage_page()
+    filters = {k: data[k] for k in ('puskesmas', 'from', 'to') if data[k]}
+    return _render('manage.html', puskesmas_list=get_aggregate().puskesmas_list,
+                   filters=filters, date_from=data['from'], date_to=data['to'], **data)
+
+@bp.route('/api/manage-data')
+def manage_data():
+    data = _manage_page()
+    with phase('serialize'):
+        return jsonify(data)
+
+def _snapshot_row(snap, rownum):
+    """Data row ``rownum`` (1-based, tanpa header) of the snapshot and its content hash."""
+    if rownum < 1 or rownum > len(snap.rows):
+        return None, None
+    row = snap.rows[rownum - 1]
+    return row, row_hash(row, len(snap.headers))
 
 @bp.route('/edit/<int:rownum>', methods=['GET','POST'])
 def edit_row(rownum):
     # rownum = nomor baris data (1-based, tanpa header). Di sheet actual baris = rownum + 1
-    headers, rows = fetch_all()
-    if rownum < 1 or rownum > len(rows):
+    snap = get_snapshot()
+    headers = snap.headers
+    current, current_hash = _snapshot_row(snap, rownum)
+    if current is None:
         flash('Baris tidak ditemukan', 'error')
         return redirect(url_for('main.manage'))
-    sheet_row_index = rownum + 1  # plus header
-    sheet = get_sheet()
-    current = sheet.row_values(sheet_row_index + 1)  # +1 untuk header offset
     if request.method == 'POST':
         new_values = [request.form.get(f'col_{i}', '') for i in range(len(headers))]
-        rng = a1_row_range_for_headers(sheet_row_index + 1, len(headers))
-        sheet.update(rng, [new_values])
+        batch = new_batch(headers)
+        batch.edit(rownum, request.form.get('row_hash') or current_hash, new_values)
+        result = batch.commit()
+        invalidate_cache()
+        live.kick()
+        if not result.ok:
+            flash(f'Baris {rownum} sudah berubah di Google Sheets. Muat ulang lalu coba lagi.', 'error')
+            return redirect(url_for('main.edit_row', rownum=rownum))
         flash(f'Baris {rownum} diperbarui.', 'success')
         return redirect(url_for('main.manage'))
-    return render_template('edit_row.html', headers=headers, current=current, rownum=rownum)
+    return _render('edit_row.html', headers=headers, current=current, rownum=rownum,
+                           row_hash=current_hash)
 
 @bp.route('/delete/<int:rownum>', methods=['POST'])
 def delete_row(rownum):
-    headers, rows = fetch_all()
-    if rownum < 1 or rownum > len(rows):
+    snap = get_snapshot()
+    current, current_hash = _snapshot_row(snap, rownum)
+    as_json = not request.accept_mimetypes.accept_html
+    if current is None:
+        if not as_json:
+            flash('Baris tidak ditemukan', 'error')
+            return redirect(url_for('main.manage'))
         return jsonify({'error': 'Baris tidak ditemukan'}), 404
-    sheet = get_sheet()
-    sheet.delete_rows(rownum + 1)  # +1 untuk header
+    batch = new_batch(snap.headers)
+    batch.delete(rownum, request.form.get('row_hash') or current_hash)
+    result = batch.commit()
+    invalidate_cache()
+    live.kick()
+    if not as_json:
+        flash(f'Baris {rownum} dihapus.' if result.ok
+              else f'Baris {rownum} sudah berubah di Google Sheets, tidak dihapus.',
+              'success' if result.ok else 'error')
+        return redirect(url_for('main.manage'))
+    if not result.ok:
+        return jsonify({'error': 'Baris sudah berubah', **result.as_dict()}), 409
     return jsonify({'status': 'ok'})
 
+@bp.route('/api/rows/bulk', methods=['POST'])
+def bulk_rows():
+    """Apply many edits/deletes in one batch.
+
+    Body: ``{"edits": [{"row": n, "hash": h, "values": [...]}], "deletes": [{"row": n, "hash": h}]}``
+    where ``hash`` is the ``row_hash`` shown by /api/manage-data. Rows whose content
+    changed since are skipped and returned in ``conflicts`` (HTTP 409).
+    """
+    payload = request.get_json(silent=True) or {}
+    snap = get_snapshot()
+    batch = new_batch(snap.headers)
+    try:
+        for e in payload.get('edits', []):
+            batch.edit(int(e['row']), e['hash'], e['values'])
+        for d in payload.get('deletes', []):
+            batch.delete(int(d['row']), d['hash'])
+    except (KeyError, TypeError, ValueError):
+        return jsonify({'error': 'Format permintaan tidak valid'}), 400
+    result = batch.commit()
+    if result.edited or result.deleted:
+        invalidate_cache()
+        live.kick()
+    return jsonify(result.as_dict()), (200 if result.ok else 409)
+
+@bp.route('/api/ingest', methods=['POST'])
+def ingest():
+    """Push one new form response (e.g. from an Apps Script ``onFormSubmit`` trigger).
+
+    Auth: ``Authorization: Bearer <CERIA_SKM_INGEST_TOKEN>``. Body is either
+    ``{"values": [...]}`` in sheet column order or ``{"namedValues": {header: [value]}}``
+    as provided by Apps Script.
+    """
+    if not INGEST_TOKEN:
+        return jsonify({'error': 'Ingest tidak diaktifkan'}), 404
+    auth = request.headers.get('Authorization', '')
+    token = auth[7:] if auth.startswith('Bearer ') else request.headers.get('X-Ceria-Token', '')
+    if not hmac.compare_digest(token.encode('utf-8'), INGEST_TOKEN.encode('utf-8')):
+        return jsonify({'error': 'Token tidak valid'}), 401
+    payload = request.get_json(silent=True) or {}
+    values = payload.get('values')
+    named = payload.get('namedValues')
+    if values is None and isinstance(named, dict):
+        headers = get_snapshot().headers
+        def pick(h):
+            v = named.get(h, '')
+            return ', '.join(map(str, v)) if isinstance(v, list) else str(v)
+        values = [pick(h) for h in headers]
+    if not isinstance(values, list):
+        return jsonify({'error': 'Body harus berisi "values" atau "namedValues"'}), 400
+    rownum = ingest_row(values)
+    live.kick()
+    return jsonify({'status': 'ok', 'rownum': rownum, 'data_version': get_data_version()}), 201
+
 @bp.route('/export/summary.csv')
 def export_summary():
-    headers, rows = fetch_all()
-    labels, avgs, overall = compute_averages(headers, rows)
-    si = io.StringIO()
-    writer = csv.writer(si)
-    writer.writerow(['Pertanyaan','Rata-rata','Keterangan'])
-    for q,a in zip(labels, avgs):
-        writer.writerow([q, f"{a:.2f}", remark(a)])
-    writer.writerow([])
-    writer.writerow(['Rata-rata Keseluruhan', f"{overall:.2f}", remark(overall)])
-    mem = io.BytesIO(si.getvalue().encode('utf-8'))
-    mem.seek(0)
-    return send_file(mem, as_attachment=True, download_name='CERIA_SKM_Ringkasan.csv', mimetype='text/csv')
+    snap = get_snapshot()
+    agg = get_aggregate(snap)
+    labels, avgs, overall = agg.labels, agg.averages, agg.overall
+    def rows():
+        yield ['Pertanyaan','Rata-rata','Keterangan']
+        for q,a in zip(labels, avgs):
+            yield [q, f"{a:.2f}", remark(a)]
+        yield []
+        yield ['Rata-rata Keseluruhan', f"{overall:.2f}", remark(overall)]
+    return csv_response(rows(), 'CERIA_SKM_Ringkasan.csv', 'summary-' + get_data_version(snap))
 
 @bp.route('/export/full.csv')
 def export_full():
-    headers, rows = fetch_all()
-    si = io.StringIO()
-    writer = csv.writer(si)
-    writer.writerow(headers)
-    for r in rows:
-        vals = r + [''] * (len(headers) - len(r))
-        writer.writerow(vals)
-    mem = io.BytesIO(si.getvalue().encode('utf-8'))
-    mem.seek(0)
-    return send_file(mem, as_attachment=True, download_name='CERIA_SKM_DataPenuh.csv', mimetype='text/csv')
+    """All rows, or only those of ``puskesmas`` / ``from`` / ``to`` (as on /manage)."""
+    snap = get_snapshot()
+    headers = snap.headers
+    puskesmas, date_from, date_to = _row_filters()
+    etag = 'full-' + get_data_version(snap)
+    if puskesmas or date_from or date_to:
+        data = [snap.rows[i] for i in search_rows(snap, None, puskesmas, date_from, date_to)]
+        key = f"{puskesmas}|{date_from}|{date_to}".encode('utf-8')
+        etag += '-' + hashlib.sha1(key).hexdigest()[:10]
+    else:
+        data = snap.rows
+    def rows():
+        yield headers
+        for r in data:
+            yield r + [''] * (len(headers) - len(r))
+    return csv_response(rows(), 'CERIA_SKM_DataPenuh.csv', etag)
+
+_parquet_cache = {"version": None, "data": None}
+
+@bp.route('/export/full.parquet')
+def export_parquet():
+    """Columnar export for analysts (needs the optional ``pyarrow`` package)."""
+    snap = get_snapshot()
+    etag = 'parquet-' + get_data_version(snap)
+    cached = not_modified(etag)
+    if cached is not None:
+        return cached
+    if _parquet_cache['version'] != etag:
+        try:
+            data = parquet_bytes(snap.headers, snap.rows)
+        except ImportError:
+            return jsonify({'error': 'Ekspor Parquet membutuhkan paket pyarrow'}), 501
+        _parquet_cache.update(version=etag, data=data)
+    resp = make_response(_parquet_cache['data'])
+    resp.headers['Content-Type'] = 'application/vnd.apache.parquet'
+    resp.headers['Content-Disposition'] = 'attachment; filename=CERIA_SKM_DataPenuh.parquet'
+    resp.set_etag(etag)
+    return resp
+
+
+charts = chart_render.ChartRenderer(CHART_WORKERS, CHART_CACHE_BYTES, CHART_TIMEOUT_SECONDS)
+
+def _rendered(key, fn, make_args, fmt, filename):
+    """Serve a chart/report for the current data version (304 / cached / rendered)."""
+    if not chart_render.available():
+        return jsonify({'error': 'Grafik server membutuhkan paket matplotlib'}), 501
+    try:
+        date_from, date_to = _parse_date_arg('from'), _parse_date_arg('to')
+    except ValueError:
+        return jsonify({'error': 'Format tanggal harus YYYY-MM-DD'}), 400
+    snap = get_snapshot()
+    version = get_data_version(snap)
+    last_modified = get_last_modified(snap)
+    etag = f"{fmt}-{version}"
+    cached = not_modified(etag, last_modified)
+    if cached is not None:
+        return cached
+    try:
+        with phase('render'):
+            data = charts.get(key + (fmt, version, date_from, date_to), fn,
+                              lambda: make_args(snap, date_from, date_to))
+    except chart_render.RenderTimeout:
+        resp = jsonify({'error': 'Grafik masih dibuat, coba lagi sebentar lagi'})
+        resp.headers['Retry-After'] = '5'
+        return resp, 503
+    resp = Response(data, mimetype=chart_render.FORMATS[fmt])
+    resp.headers['Content-Disposition'] = f'inline; filename={filename}.{fmt}'
+    resp.headers['Cache-Control'] = 'no-cache'
+    resp.set_etag(etag)
+    if last_modified:
+        resp.last_modified = last_modified
+    return resp
+
+def _period(date_from, date_to):
+    if not (date_from or date_to):
+        return ''
+    return f" · {date_from.isoformat() if date_from else '...'} s.d. {date_to.isoformat() if date_to else '...'}"
+
+def _chart_spec(snap, puskesmas, date_from, date_to):
+    p = _dashboard_payload(snap, puskesmas, date_from, date_to)
+    return {
+        'title': f"Rata-rata per Pertanyaan – {puskesmas or 'Semua Puskesmas'}",
+        'subtitle': (f"Rata-rata keseluruhan {p['overall']:.2f} ({p['overall_remark']}) · "
+                     f"{p['responses']} respons{_period(date_from, date_to)}"),
+        'labels': p['labels'],
+        'values': p['averages'],
+        'threshold': p['threshold'],
+    }
+
+@bp.route('/chart/overall.<any(png, svg):fmt>')
+def chart_overall(fmt):
+    """Question averages of all Puskesmas, rendered on the server (optional ``from`` / ``to``)."""
+    return _rendered(('overall',), chart_render.render_chart,
+                     lambda snap, f, t: (_chart_spec(snap, None, f, t), fmt), fmt, 'CERIA_SKM_Grafik')
+
+@bp.route('/chart/puskesmas/<name>.<any(png, svg):fmt>')
+def chart_puskesmas(name, fmt):
+    """Question averages of one Puskesmas, rendered on the server."""
+    if name not in get_aggregate(get_snapshot()).puskesmas_list:
+        return jsonify({'error': 'Puskesmas tidak ditemukan'}), 404
+    return _rendered(('puskesmas', name), chart_render.render_chart,
+                     lambda snap, f, t: (_chart_spec(snap, name, f, t), fmt), fmt, 'CERIA_SKM_Grafik_Puskesmas')
+
+def _report_data(snap, date_from, date_to):
+    p = _dashboard_payload(snap, None, date_from, date_to)
+    changed = get_last_modified(snap)
+    generated = f" · data per {changed.astimezone().strftime('%d/%m/%Y %H:%M')}" if changed else ''
+    return {
+        'title': 'Laporan Survei Kepuasan Masyarakat – CERIA SKM',
+        'summary': (f"Rata-rata keseluruhan {p['overall']:.2f} ({p['overall_remark']}) · "
+                    f"{p['responses']} respons{_period(date_from, date_to)}{generated}"),
+        'labels': p['labels'],
+        'averages': p['averages'],
+        'grouped': p['grouped'],
+        'threshold': p['threshold'],
+    }
+
+@bp.route('/report.pdf')
+def report_pdf():
+    """Printable PDF report (charts + per-Puskesmas table); optional ``from`` / ``to``."""
+    return _rendered(('report',), chart_render.render_report,
+                     lambda snap, f, t: (_report_data(snap, f, t),), 'pdf', 'CERIA_SKM_Laporan')
@@ -0,0 +1,181 @@
+"""Batched edit/delete of sheet rows with optimistic concurrency.
+
+A ``WriteBatch`` collects edits and deletes (coalesced per row: the last
+edit wins, a delete overrides edits) and ``commit()`` applies them with:
+
+  1. one ``batch_get`` of just the affected rows, comparing each row with the
+     content hash the client saw (``row_hash``) -- rows changed or shifted in
+     the meantime are reported as conflicts and left alone;
+  2. one spreadsheet ``batch_update``: all ``updateCells`` first, then the
+     ``deleteDimension`` requests from the bottom up, so every request still
+     refers to the original row numbers.
+
+Row numbers are data rows (1-based, without the header), as used by /manage.
+With several sources (``CERIA_SKM_SOURCES``) a ``MergedWriteBatch`` maps each
+merged row back to its worksheet and runs one ``WriteBatch`` per source.
+"""
+import hashlib
+import threading
+from functools import partial
+
+from .sheets import a1_row_range_for_headers, get_loader, get_sheet, sheets_call
+from .sources import MergedLoader
+
+_commit_lock = threading.Lock()
+
+
+def row_hash(row, width):
+    vals = list(row[:width]) + [''] * (width - len(row))
+    return hashlib.sha1("\x1f".join(vals).encode('utf-8')).hexdigest()[:16]
+
+
+class BatchResult:
+    def __init__(self):
+        self.edited = []
+        self.deleted = []
+        self.conflicts = []
+
+    @property
+    def ok(self):
+        return not self.conflicts
+
+    def as_dict(self):
+        return {'edited': self.edited, 'deleted': self.deleted, 'conflicts': self.conflicts}
+
+
+class WriteBatch:
+    def __init__(self, worksheet, width, call, view=None, hash_width=None):
+        self.worksheet = worksheet
+        self.width = width
+        self._call = call
+        # Rows are hashed as the client saw them: ``view`` maps a sheet row to that layout.
+        self._view = view
+        self._hash_width = hash_width or width
+        self._edits = {}
+        self._deletes = {}
+
+    def __len__(self):
+        return len(self._edits) + len(self._deletes)
+
+    def edit(self, rownum, expected_hash, values):
+        if rownum in self._deletes:
+            return
+        values = list(values[:self.width]) + [''] * (self.width - len(values))
+        prev = self._edits.get(rownum)
+        # Keep the hash of the first edit: it describes what is in the sheet now.
+        self._edits[rownum] = (prev[0] if prev else expected_hash, values)
+
+    def delete(self, rownum, expected_hash):
+        prev = self._edits.pop(rownum, None)
+        self._deletes.setdefault(rownum, prev[0] if prev else expected_hash)
+
+    def _current_hashes(self, rownums):
+        ranges = [a1_row_range_for_headers(n + 1, self.width) for n in rownums]
+        # A read: a real key gets the scheduler's 5xx/timeout retries (only identical reads share it).
+        key = ('row_hashes', self.worksheet.spreadsheet.id, self.worksheet.id, tuple(ranges))
+        values = self._call(key, self.worksheet.batch_get, ranges)
+        hashes = {}
+        for n, vr in zip(rownums, values):
+            row = list(vr[0]) if vr else []
+            hashes[n] = row_hash(self._view(row) if self._view else row, self._hash_width)
+        return hashes
+
+    def commit(self):
+        result = BatchResult()
+        if not len(self):
+            return result
+        with _commit_lock:
+            rownums = sorted(set(self._edits) | set(self._deletes))
+            current = self._current_hashes(rownums)
+            requests = []
+            sheet_id = self.worksheet.id
+            for n in sorted(self._edits):
+                expected, values = self._edits[n]
+                if current.get(n) != expected:
+                    result.conflicts.append(n)
+                    continue
+                requests.append({'updateCells': {
+                    'range': {'sheetId': sheet_id, 'startRowIndex': n, 'endRowIndex': n + 1,
+                              'startColumnIndex': 0, 'endColumnIndex': self.width},
+                    'rows': [{'values': [{'userEnteredValue': {'stringValue': v}} for v in values]}],
+                    'fields': 'userEnteredValue',
+                }})
+                result.edited.append(n)
+            for n in sorted(self._deletes, reverse=True):
+                if current.get(n) != self._deletes[n]:
+                    result.conflicts.append(n)
+                    continue
+                requests.append({'deleteDimension': {'range': {
+                    'sheetId': sheet_id, 'dimension': 'ROWS', 'startIndex': n, 'endIndex': n + 1,
+                }}})
+                result.deleted.append(n)
+            if requests:
+                self._call(None, self.worksheet.spreadsheet.batch_update, {'requests': requests})
+        self._edits.clear()
+        self._deletes.clear()
+        result.conflicts.sort()
+        return result
+
+
+class MergedWriteBatch:
+    """``WriteBatch`` per source of a ``MergedLoader``; row numbers and values are merged ones."""
+
+    def __init__(self, merged, width, call):
+        self.merged = merged
+        self.width = width
+        self._call = call
+        self._batches = {}      # source index -> WriteBatch
+        self._rownums = {}      # (source index, source row) -> merged row
+        self._unknown = set()   # merged rows no longer in any source
+
+    def __len__(self):
+        return sum(len(b) for b in self._batches.values()) + len(self._unknown)
+
+    def _route(self, rownum):
+        """``(WriteBatch of the row's source, row number there)``, or ``(None, None)``."""
+        origin = self.merged.origin(rownum)
+        if origin is None:
+            self._unknown.add(rownum)
+            return None, None
+        src, local = origin
+        batch = self._batches.get(src)
+        if batch is None:
+            batch = self._batches[src] = WriteBatch(
+                self.merged.loaders[src].client.worksheet(), self.merged.source_width(src),
+                self._call, view=partial(self.merged.to_merged, src), hash_width=self.width)
+            batch.source = src
+        self._rownums[(src, local)] = rownum
+        return batch, local
+
+    def edit(self, rownum, expected_hash, values):
+        batch, local = self._route(rownum)
+        if batch is not None:
+            batch.edit(local, expected_hash, self.merged.to_source(batch.source, values))
+
+    def delete(self, rownum, expected_hash):
+        batch, local = self._route(rownum)
+        if batch is not None:
+            batch.delete(local, expected_hash)
+
+    def commit(self):
+        result = BatchResult()
+        for src, batch in sorted(self._batches.items()):
+            part = batch.commit()
+            result.edited += [self._rownums[(src, n)] for n in part.edited]
+            result.deleted += [self._rownums[(src, n)] for n in part.deleted]
+            result.conflicts += [self._rownums[(src, n)] for n in part.conflicts]
+        result.conflicts += sorted(self._unknown)
+        self._batches.clear()
+        self._rownums.clear()
+        self._unknown.clear()
+        for lst in (result.edited, result.deleted, result.conflicts):
+            lst.sort()
+        return result
+
+
+def new_batch(headers):
+    """Empty batch against the live worksheet(s) (``headers`` = snapshot headers)."""
+    loader = get_loader()
+    if isinstance(loader, MergedLoader):
+        return MergedWriteBatch(loader, len(headers), sheets_call)
+    return WriteBatch(get_sheet(), len(headers), sheets_call)
@@ -0,0 +1,149 @@
+"""Synthetic-data benchmarks for CERIA SKM (no Google Sheets needed).
+
+Usage, from the repository root::
+
+    python benchmarks/run_benchmarks.py                       # 10k and 100k responses
+    python benchmarks/run_benchmarks.py --rows 1000000 --only compute
+    python benchmarks/run_benchmarks.py --latency 0.3 --json hasil.json
+    python benchmarks/run_benchmarks.py --compare hasil.json  # flag regressions
+
+Data comes from ``app.fakes.synthetic_responses`` and is served through a
+``FakeWorksheet`` (``--latency`` seconds per API call).  Every benchmark is
+timed as the best of ``--repeat`` runs and then run once more under
+``tracemalloc`` for its peak memory.  Throughput is response rows per
+second (calls per second for ``get_question_columns``).
+"""
+import argparse
+import gc
+import json
+import os
+import sys
+import time
+import tracemalloc
+from urllib.parse import quote
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+os.chdir(ROOT)
+
+from app import create_app, sheets, views  # noqa: E402
+from app.fakes import FakeWorksheet, synthetic_responses  # noqa: E402
+from app.sheets import compute_averages, compute_group_overall, get_question_columns  # noqa: E402
+import generate_static_site  # noqa: E402
+
+QUESTION_COLUMN_CALLS = 1000
+
+
+def measure(fn, repeat):
+    best = float('inf')
+    for _ in range(repeat):
+        gc.collect()
+        started = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - started)
+    gc.collect()
+    tracemalloc.start()
+    try:
+        fn()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return best, peak
+
+
+def _get(client, url):
+    def run():
+        resp = client.get(url)
+        resp.get_data()  # drain streamed bodies (CSV exports)
+        if resp.status_code != 200:
+            raise RuntimeError(f"{url}: HTTP {resp.status_code}")
+    return run
+
+
+def _cold(client, url):
+    """Reload from the (fake) sheet and recompute: no snapshot, aggregate or JSON reuse."""
+    def run():
+        sheets.invalidate_cache()
+        views._dashboard_json.clear()
+        _get(client, url)()
+    return run
+
+
+def benchmarks(values, client):
+    """``(group, name, fn, units)`` for one dataset."""
+    headers, rows = values[0], values[1:]
+    n = len(rows)
+    some_clinic = next((r[-1] for r in rows if len(r) == len(headers)), '')
+
+    def question_columns():
+        for _ in range(QUESTION_COLUMN_CALLS):
+            get_question_columns(headers)
+
+    return [
+        ('compute', 'get_question_columns', question_columns, QUESTION_COLUMN_CALLS),
+        ('compute', 'compute_averages', lambda: compute_averages(headers, rows), n),
+        ('compute', 'compute_group_overall', lambda: compute_group_overall(headers, rows), n),
+        ('compute', 'generate_static_site.compute', lambda: generate_static_site.compute(headers, rows), n),
+        ('endpoint', 'GET /api/dashboard-data (cold)', _cold(client, '/api/dashboard-data'), n),
+        ('endpoint', 'GET /api/dashboard-data (warm)', _get(client, '/api/dashboard-data'), n),
+        ('endpoint', 'GET /api/dashboard-data?puskesmas', _get(client, '/api/dashboard-data?puskesmas=' + quote(some_clinic)), n),
+        ('endpoint', 'GET /manage', _get(client, '/manage'), n),
+        ('endpoint', 'GET /manage?q=', _get(client, '/manage?q=Responden+1'), n),
+        ('endpoint', 'GET /export/summary.csv', _get(client, '/export/summary.csv'), n),
+        ('endpoint', 'GET /export/full.csv', _get(client, '/export/full.csv'), n),
+    ]
+
+
+def run(sizes, only, repeat, latency, puskesmas):
+    client = create_app().test_client()
+    results = []
+    for size in sizes:
+        values = synthetic_responses(size, puskesmas=puskesmas, seed=size)
+        sheets.use_worksheet(FakeWorksheet(values, latency=latency))
+        for group, name, fn, units in benchmarks(values, client):
+            if only and only not in (group, name):
+                continue
+            seconds, peak = measure(fn, repeat)
+            res = {'name': name, 'rows': size, 'seconds': seconds,
+                   'per_second': units / seconds if seconds else None, 'peak_bytes': peak}
+            results.append(res)
+            print_result(res)
+    return results
+
+
+def print_result(res, baseline=None):
+    line = (f"{res['name']:<38} {res['rows']:>9,} rows  {res['seconds'] * 1000:>10.2f} ms"
+            f"  {res['per_second'] or 0:>14,.0f}/s  {res['peak_bytes'] / 2**20:>9.1f} MiB")
+    if baseline:
+        change = res['seconds'] / baseline['seconds'] - 1 if baseline['seconds'] else 0.0
+        line += f"  {change:+7.1%}" + ("  << LEBIH LAMBAT" if change > 0.2 else "")
+    print(line, flush=True)
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument('--rows', default='10000,100000', help='ukuran dataset, dipisah koma')
+    ap.add_argument('--only', help="nama benchmark atau grup ('compute' / 'endpoint')")
+    ap.add_argument('--repeat', type=int, default=3)
+    ap.add_argument('--latency', type=float, default=0.0, help='detik per panggilan FakeWorksheet')
+    ap.add_argument('--puskesmas', type=int, default=40, help='jumlah Puskesmas sintetis')
+    ap.add_argument('--json', help='simpan hasil ke file JSON')
+    ap.add_argument('--compare', help='bandingkan dengan hasil JSON sebelumnya')
+    args = ap.parse_args(argv)
+
+    sizes = [int(s) for s in args.rows.split(',') if s.strip()]
+    results = run(sizes, args.only, args.repeat, args.latency, args.puskesmas)
+    if args.compare:
+        with open(args.compare, encoding='utf-8') as f:
+            baseline = {(r['name'], r['rows']): r for r in json.load(f)}
+        print(f"\nDibandingkan dengan {args.compare} (waktu; > +20% ditandai):")
+        for res in results:
+            print_result(res, baseline.get((res['name'], res['rows'])))
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
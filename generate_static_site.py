@@ -5,27 +5,44 @@ This script:
  2. Computes metrics (per question, overall, per Puskesmas)
  3. Emits docs/ directory with:
     - index.html (landing + quick summary + link dashboard)
-    - dashboard.html (interactive chart using Chart.js fed by data.json)
-    - data.json (metrics & raw processed data)
+    - dashboard.html (interactive chart using Chart.js fed by data.<hash>.json)
+    - data.<hash>.json (compact index: overall metrics + shard file per Puskesmas)
+    - puskesmas-<slug>.<hash>.json (per-Puskesmas averages; fetched on demand)
     - summary.csv (ringkasan per pertanyaan + overall)
     - full.csv (seluruh baris sheet)
-    - qr.png (QR kode menuju Google Form)
-    - style.css (copied from app static for consistent styling)
+    - qr.<hash>.png (QR kode menuju Google Form)
+    - style.<hash>.css (copied from app static for consistent styling)
+    - manifest.json (data version + content hash of every output)
+
+The build is incremental: outputs whose content hash matches manifest.json are
+not rewritten, and the whole build stops early when neither the sheet's data
+version nor this generator changed (``--force`` rebuilds anyway).  Assets get
+content-hashed file names so they can be cached forever, and every output is
+written (in parallel) together with a precompressed ``.gz`` copy.
 
 Secrets / Inputs (provide as GitHub Actions secrets):
   CERIA_SKM_SERVICE_ACCOUNT_JSON   -> full JSON (multiline accepted)
   CERIA_SKM_SPREADSHEET_ID         -> sheet ID
   CERIA_SKM_WORKSHEET_NAME         -> worksheet/tab name
+Optional:
+  CERIA_SKM_DOCS_DIR               -> output directory (default: docs)
+  CERIA_SKM_STATIC_GZIP            -> "0" disables the .gz copies
 
 NOTE: Do NOT publish the service account JSON; this script only uses it runtime.
 """
 from __future__ import annotations
-import os, json, textwrap, csv, io, statistics
+import os, re, sys, json, csv, io, gzip, hashlib
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 import qrcode
 import gspread
 from oauth2client.service_account import ServiceAccountCredentials
 
+import app.aggregate as _aggregate_module
+import app.config as _config_module
+from app.aggregate import aggregate, remark
+from app.config import EVALUATION_THRESHOLD, FORM_URL
+
 SCOPE = [
     "https://spreadsheets.google.com/feeds",
     "https://www.googleapis.com/auth/drive"
@@ -33,157 +50,175 @@ SCOPE = [
 
 SPREADSHEET_ID = os.getenv("CERIA_SKM_SPREADSHEET_ID") or os.getenv("SPREADSHEET_ID")
 WORKSHEET_NAME = os.getenv("CERIA_SKM_WORKSHEET_NAME", "Form Responses 2")
-THRESHOLD = float(os.getenv("CERIA_SKM_THRESHOLD", "3.0"))
-FORM_URL = os.getenv("CERIA_SKM_FORM_URL", "https://forms.gle/9wdnAW4BkxVRGcKp7")
-
-if not SPREADSHEET_ID:
-    raise SystemExit("Missing CERIA_SKM_SPREADSHEET_ID environment variable")
-
-sa_raw = os.getenv("CERIA_SKM_SERVICE_ACCOUNT_JSON")
-if not sa_raw:
-    raise SystemExit("Missing CERIA_SKM_SERVICE_ACCOUNT_JSON secret")
-try:
-    sa_info = json.loads(sa_raw)
-except json.JSONDecodeError as e:  # pragma: no cover
-    raise SystemExit(f"Invalid service account JSON: {e}")
-
-creds = ServiceAccountCredentials.from_json_keyfile_dict(sa_info, SCOPE)
-gc = gspread.authorize(creds)
-ws = gc.open_by_key(SPREADSHEET_ID).worksheet(WORKSHEET_NAME)
-values = ws.get_all_values()
-headers = values[0] if values else []
-rows = values[1:] if len(values) > 1 else []
-
-# Configuration borrowed from app/config.py (ensure consistency)
-META_COLUMNS_OFFSET = 8
-EXCLUDE_COLUMNS_BY_NAME = {n.lower() for n in {
-    "Saran", "Saran/masukan", "Komentar", "Feedback", "Umpan Balik", "Kritik", "Catatan",
-    "Saran Bapak/Ibu untuk peningkatan pelayanan Puskesmas ini", "Puskesmas"
-}}
-EXCLUDE_COLUMNS_BY_QUESTION = {n.lower() for n in {
-    "Sarana Bayak/buruk untuk peningkatan pelayanan Puskesmas ini",
-    "Petugas kurang sabar, ramah, dan menghargai pasien"
-}}
-SCORE_MAP = {
-    "tidak baik": 1, "kurang baik": 2, "baik": 3, "sangat baik": 4,
-    "tidak mudah": 1, "kurang mudah": 2, "mudah": 3, "sangat mudah": 4,
-    "tidak sesuai": 1, "kurang sesuai": 2, "sesuai": 3, "sangat sesuai": 4,
-    "tidak ramah": 1, "kurang ramah": 2, "ramah": 3, "sangat ramah": 4,
-    "tidak ditanggapi": 1, "kurang ditanggapi": 2, "ditanggapi": 3, "sangat ditanggapi": 4,
-}
+DOCS_DIR = Path(os.getenv("CERIA_SKM_DOCS_DIR", "docs"))
+GZIP_OUTPUTS = os.getenv("CERIA_SKM_STATIC_GZIP", "1") != "0"
+WRITE_WORKERS = 8
+MANIFEST_NAME = 'manifest.json'
+STYLE_SRC = Path('app/static/style.css')
+FALLBACK_STYLE = "body{font-family:system-ui,sans-serif;margin:20px;} .badge{display:inline-block;padding:2px 6px;border-radius:4px;background:#eee;} .ok{background:#16a34a;color:#fff;} .warn{background:#dc2626;color:#fff;} table{border-collapse:collapse;width:100%;} th,td{border:1px solid #ddd;padding:6px;} th{background:#f3f4f6;} "
 
-def question_columns():
-    start = META_COLUMNS_OFFSET if META_COLUMNS_OFFSET is not None else 0
-    idxs = list(range(start, len(headers)))
-    if headers and headers[-1].strip().lower() in EXCLUDE_COLUMNS_BY_NAME:
-        idxs.pop(-1)
-    filtered = []
-    for i in idxs:
-        name = headers[i].strip().lower()
-        if name in EXCLUDE_COLUMNS_BY_NAME or name in EXCLUDE_COLUMNS_BY_QUESTION:
-            continue
-        filtered.append(i)
-    return filtered
-
-def map_score(v: str) -> float:
-    v2 = v.strip().lower()
+# --- Google Sheets -----------------------------------------------------------
+def open_worksheet():
+    if not SPREADSHEET_ID:
+        raise SystemExit("Missing CERIA_SKM_SPREADSHEET_ID environment variable")
+    sa_raw = os.getenv("CERIA_SKM_SERVICE_ACCOUNT_JSON")
+    if not sa_raw:
+        raise SystemExit("Missing CERIA_SKM_SERVICE_ACCOUNT_JSON secret")
     try:
-        return float(v2)
-    except ValueError:
-        return SCORE_MAP.get(v2, 0.0)
-
-def compute():
-    qcols = question_columns()
-    per_q = []
-    for c in qcols:
-        scores = [map_score(r[c]) for r in rows if c < len(r)]
-        scores = [s for s in scores if s > 0]
-        avg = (sum(scores)/len(scores)) if scores else 0.0
-        per_q.append((headers[c], avg))
-    labels = [x[0] for x in per_q]
-    avgs = [x[1] for x in per_q]
-    overall = (sum(avgs)/len(avgs)) if avgs else 0.0
-    # Group by Puskesmas
+        sa_info = json.loads(sa_raw)
+    except json.JSONDecodeError as e:  # pragma: no cover
+        raise SystemExit(f"Invalid service account JSON: {e}")
+    creds = ServiceAccountCredentials.from_json_keyfile_dict(sa_info, SCOPE)
+    gc = gspread.authorize(creds)
+    return gc.open_by_key(SPREADSHEET_ID).worksheet(WORKSHEET_NAME)
+
+
+def last_update_time(ws):
+    """Drive ``modifiedTime`` of the spreadsheet (one cheap call), or None if unavailable."""
     try:
-        p_idx = next(i for i,h in enumerate(headers) if h.strip().lower()=="puskesmas")
-    except StopIteration:
-        p_idx = None
-    grouped = []
-    if p_idx is not None:
-        groups = {}
-        for r in rows:
-            key = r[p_idx] if p_idx < len(r) and r[p_idx].strip() else "<Tanpa Nama>"
-            groups.setdefault(key, []).append(r)
-        for k in sorted(groups):
-            # recompute avg for group
-            g_scores = []
-            for r in groups[k]:
-                row_vals = []
-                for c in question_columns():
-                    if c < len(r):
-                        sc = map_score(r[c])
-                        if sc>0: row_vals.append(sc)
-                if row_vals:
-                    g_scores.append(sum(row_vals)/len(row_vals))
-            g_avg = statistics.mean(g_scores) if g_scores else 0.0
-            grouped.append({"name": k, "avg": g_avg, "remark": ("OK" if g_avg >= THRESHOLD else "Evaluasi Diperlukan")})
-    data = {
-        "labels": labels,
-        "averages": avgs,
+        return ws.spreadsheet.get_lastUpdateTime()
+    except Exception:
+        return None
+
+
+def data_version(headers, rows):
+    """Row count + content hash; same format as the app's ``get_data_version``."""
+    h = hashlib.sha1("\x1f".join(headers).encode('utf-8'))
+    for r in rows:
+        h.update(b"\x1e")
+        h.update("\x1f".join(r).encode('utf-8'))
+    return f"{len(rows)}-{h.hexdigest()[:20]}"
+
+
+_CONFIG_SECRETS = {'SECRET_KEY', 'INGEST_TOKEN'}
+
+
+def effective_config():
+    """Config values in effect (after env overrides), minus secrets."""
+    values = {}
+    for name in dir(_config_module):
+        if name.isupper() and name not in _CONFIG_SECRETS:
+            value = getattr(_config_module, name)
+            values[name] = sorted(value) if isinstance(value, (set, frozenset)) else value
+    return values
+
+
+def build_fingerprint():
+    """Hash of the generator, shared aggregation code, config and stylesheet: a change forces a rebuild.
+
+    Includes the effective config values, so e.g. a new CERIA_SKM_THRESHOLD or
+    CERIA_SKM_FORM_URL rebuilds the site even when the data is unchanged.
+    """
+    h = hashlib.sha1()
+    for path in (Path(__file__), Path(_aggregate_module.__file__), Path(_config_module.__file__), STYLE_SRC):
+        if path.exists():
+            h.update(path.read_bytes())
+    h.update(json.dumps(effective_config(), sort_keys=True, default=str).encode('utf-8'))
+    h.update(b'gz' if GZIP_OUTPUTS else b'')
+    return h.hexdigest()[:20]
+
+
+# --- metrics -------------------------------------------------------------------
+def compute(headers, rows, agg=None):
+    """Dashboard figures, computed with the app's own aggregation (``app/aggregate.py``).
+
+    One pass over the rows; numbers are identical to ``/api/dashboard-data``.
+    """
+    agg = agg or aggregate(headers, rows)
+    overall = agg.overall
+    return {
+        "labels": agg.labels,
+        "averages": agg.averages,
         "overall": overall,
-        "overall_remark": "OK" if overall >= THRESHOLD else "Evaluasi Diperlukan",
-        "grouped": grouped,
-        "threshold": THRESHOLD,
-        "puskesmas_list": sorted({ (r[p_idx] if p_idx is not None and p_idx < len(r) and r[p_idx].strip() else "<Tanpa Nama>") for r in rows }) if p_idx is not None else []
+        "overall_remark": remark(overall),
+        "grouped": [{"name": name, "avg": avg, "remark": remark(avg), "count": agg.group_count(name)}
+                    for name, avg in agg.grouped()],
+        "threshold": EVALUATION_THRESHOLD,
+        "puskesmas_list": agg.puskesmas_list,
+        "responses": agg.n_rows,
     }
-    return data
 
-data = compute()
+def shard_data(headers, rows, agg=None):
+    """Per-Puskesmas breakdown ``{name: shard}``.
 
-docs = Path('docs')
-docs.mkdir(exist_ok=True)
+    Only what dashboard.html renders for a selected clinic: response count,
+    per-question averages and the overall average, from the shared aggregation.
+    """
+    agg = agg or aggregate(headers, rows)
+    if agg.p_idx is None:
+        return {}
+    shards = {}
+    for name in agg.puskesmas_list:
+        overall = agg.group_overall(name)
+        shards[name] = {
+            "responses": agg.group_count(name),
+            "averages": agg.group_averages(name),
+            "overall": overall,
+            "overall_remark": remark(overall),
+        }
+    return shards
 
-# data.json
-(docs / 'data.json').write_text(json.dumps(data, ensure_ascii=False, indent=2), encoding='utf-8')
 
-# CSV summary
-with open(docs / 'summary.csv', 'w', newline='', encoding='utf-8') as f:
-    w = csv.writer(f)
+# --- artifacts (bytes) ---------------------------------------------------------
+def content_hash(content: bytes) -> str:
+    return hashlib.sha256(content).hexdigest()[:16]
+
+def compact_json(obj):
+    return json.dumps(obj, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+
+def shard_file(name, content, taken):
+    slug = re.sub(r'[^a-z0-9]+', '-', name.lower()).strip('-') or 'tanpa-nama'
+    base, n = slug, 2
+    while slug in taken:
+        slug, n = f"{base}-{n}", n + 1
+    taken.add(slug)
+    return fingerprinted(f"puskesmas-{slug}.json", content)
+
+def fingerprinted(name, content):
+    """``style.css`` -> ``style.<hash8>.css``."""
+    stem, dot, ext = name.rpartition('.')
+    return f"{stem}.{content_hash(content)[:8]}{dot}{ext}"
+
+def summary_csv(data):
+    buf = io.StringIO()
+    w = csv.writer(buf)
     w.writerow(['Pertanyaan','Rata-rata','Keterangan'])
     for label, avg in zip(data['labels'], data['averages']):
-        w.writerow([label, f"{avg:.2f}", 'OK' if avg >= THRESHOLD else 'Evaluasi Diperlukan'])
+        w.writerow([label, f"{avg:.2f}", remark(avg)])
     w.writerow([])
     w.writerow(['Rata-rata Keseluruhan', f"{data['overall']:.2f}", data['overall_remark']])
+    return buf.getvalue().encode('utf-8')
 
-# CSV full
-with open(docs / 'full.csv', 'w', newline='', encoding='utf-8') as f:
-    w = csv.writer(f)
+def full_csv(headers, rows):
+    buf = io.StringIO()
+    w = csv.writer(buf)
     w.writerow(headers)
     for r in rows:
         w.writerow(r + [''] * (len(headers) - len(r)))
+    return buf.getvalue().encode('utf-8')
+
+def qr_png():
+    buf = io.BytesIO()
+    qrcode.make(FORM_URL).save(buf, format='PNG')
+    return buf.getvalue()
 
-# QR code PNG
-qr_img = qrcode.make(FORM_URL)
-qr_img.save(docs / 'qr.png')
-
-# Copy style (minimal) from app/static/style.css if exists
-style_src = Path('app/static/style.css')
-if style_src.exists():
-    (docs / 'style.css').write_text(style_src.read_text(encoding='utf-8'), encoding='utf-8')
-else:
-    (docs / 'style.css').write_text("body{font-family:system-ui,sans-serif;margin:20px;} .badge{display:inline-block;padding:2px 6px;border-radius:4px;background:#eee;} .ok{background:#16a34a;color:#fff;} .warn{background:#dc2626;color:#fff;} table{border-collapse:collapse;width:100%;} th,td{border:1px solid #ddd;padding:6px;} th{background:#f3f4f6;} ", encoding='utf-8')
-
-# index.html (landing)
-index_html = f"""<!DOCTYPE html>
-<html lang=\"id\">\n<meta charset=\"utf-8\"/>\n<title>CERIA SKM – Snapshot</title>\n<link rel=\"stylesheet\" href=\"style.css\"/>\n<body>\n<h1>CERIA SKM (Snapshot Statis)</h1>\n<p>Halaman ini adalah versi <strong>read-only</strong> yang dibangun otomatis dari Google Sheets.\n Data terakhir diambil saat build workflow GitHub Actions.</p>\n<p><a href=\"dashboard.html\">Lihat Dashboard Interaktif</a> | <a href=\"summary.csv\">Unduh Ringkasan CSV</a> | <a href=\"full.csv\">Unduh Data Penuh CSV</a></p>\n<section>\n<h2>Ringkasan Cepat</h2>\n<p>Rata-rata keseluruhan: <span class=\"badge {'ok' if data['overall_remark']=='OK' else 'warn'}\">{data['overall']:.2f} – {data['overall_remark']}</span></p>\n<img src=\"qr.png\" alt=\"QR Form\" style=\"width:160px;border:1px solid #ddd;padding:6px;background:#fff;\"/>\n<p><small>Form: <a href=\"{FORM_URL}\" target=\"_blank\">{FORM_URL}</a></small></p>\n</section>\n<hr/>\n<p style=\"font-size:12px;opacity:.7;\">Dibuat otomatis oleh generate_static_site.py</p>\n</body></html>"""
-(docs / 'index.html').write_text(index_html, encoding='utf-8')
-
-# dashboard.html (client fetches data.json and renders)
-dashboard_html = """<!DOCTYPE html><html lang=\"id\"><meta charset=\"utf-8\"/><title>Dashboard – CERIA SKM</title>
-<link rel=\"stylesheet\" href=\"style.css\"/>
+def style_css():
+    # Copy style (minimal) from app/static/style.css if exists
+    if STYLE_SRC.exists():
+        return STYLE_SRC.read_bytes()
+    return FALLBACK_STYLE.encode('utf-8')
+
+def index_html(data, assets):
+    return f"""<!DOCTYPE html>
+<html lang=\"id\">\n<meta charset=\"utf-8\"/>\n<title>CERIA SKM – Snapshot</title>\n<link rel=\"stylesheet\" href=\"{assets['style.css']}\"/>\n<body>\n<h1>CERIA SKM (Snapshot Statis)</h1>\n<p>Halaman ini adalah versi <strong>read-only</strong> yang dibangun otomatis dari Google Sheets.\n Data terakhir diambil saat build workflow GitHub Actions.</p>\n<p><a href=\"dashboard.html\">Lihat Dashboard Interaktif</a> | <a href=\"summary.csv\">Unduh Ringkasan CSV</a> | <a href=\"full.csv\">Unduh Data Penuh CSV</a></p>\n<section>\n<h2>Ringkasan Cepat</h2>\n<p>Rata-rata keseluruhan: <span class=\"badge {'ok' if data['overall_remark']=='OK' else 'warn'}\">{data['overall']:.2f} – {data['overall_remark']}</span></p>\n<img src=\"{assets['qr.png']}\" alt=\"QR Form\" style=\"width:160px;border:1px solid #ddd;padding:6px;background:#fff;\"/>\n<p><small>Form: <a href=\"{FORM_URL}\" target=\"_blank\">{FORM_URL}</a></small></p>\n</section>\n<hr/>\n<p style=\"font-size:12px;opacity:.7;\">Dibuat otomatis oleh generate_static_site.py</p>\n</body></html>""".encode('utf-8')
+
+# dashboard.html (client fetches the data file and renders)
+DASHBOARD_HTML = """<!DOCTYPE html><html lang=\"id\"><meta charset=\"utf-8\"/><title>Dashboard – CERIA SKM</title>
+<link rel=\"stylesheet\" href=\"__STYLE__\"/>
 <script src=\"https://cdn.jsdelivr.net/npm/chart.js\"></script>
 <body><h1 style='margin-top:0'>Dashboard (Snapshot)</h1>
 <p><a href='index.html'>&larr; Kembali</a></p>
+<p><label>Filter Puskesmas: <select id='filterPuskesmas' onchange='show(this.value)'><option value=''>Semua</option></select></label></p>
 <div id='overview'></div>
 <canvas id='chart' height='120'></canvas>
 <h2>Ringkasan per Pertanyaan</h2>
@@ -191,24 +226,144 @@ dashboard_html = """<!DOCTYPE html><html lang=\"id\"><meta charset=\"utf-8\"/><t
 <h2>Ringkasan per Puskesmas</h2>
 <table id='tblGroup'><thead><tr><th>Puskesmas</th><th>Rata-rata</th><th>Keterangan</th></tr></thead><tbody></tbody></table>
 <script>
+let idx = null; let chart = null; const shards = new Map();
+function shard(name){
+  // Per-Puskesmas data is only downloaded when that clinic is selected (once).
+  if(!shards.has(name)) shards.set(name, fetch(idx.shards[name]).then(r=>r.json()));
+  return shards.get(name);
+}
 async function load(){
-  const res = await fetch('data.json');
-  const d = await res.json();
+  const res = await fetch('__DATA__');
+  idx = await res.json();
+  const sel = document.getElementById('filterPuskesmas');
+  idx.puskesmas_list.forEach(p=>{ if(idx.shards[p]){ const o=document.createElement('option'); o.value=o.textContent=p; sel.appendChild(o); } });
+  const tbodyG=document.querySelector('#tblGroup tbody');
+  idx.grouped.forEach(g=>{const c=g.remark==='OK'?'ok':'warn'; tbodyG.innerHTML+=`<tr><td>${g.name}</td><td>${g.avg.toFixed(2)}</td><td><span class='badge ${c}'>${g.remark}</span></td></tr>`});
+  show('');
+}
+async function show(name){
+  const d = name ? await shard(name) : idx;
   const ov = document.getElementById('overview');
   const cls = d.overall_remark==='OK' ? 'ok':'warn';
-  ov.innerHTML = `<p>Rata-rata keseluruhan: <span class="badge ${cls}">${d.overall.toFixed(2)} – ${d.overall_remark}</span></p>`;
-  const ctx = document.getElementById('chart').getContext('2d');
-  new Chart(ctx,{type:'bar',data:{labels:d.labels,datasets:[{label:'Rata-rata',data:d.averages,backgroundColor:d.labels.map(()=> '#2563eb')}]},options:{scales:{y:{beginAtZero:true,max:4}}}});
+  const n = name ? ` · ${d.responses} responden` : '';
+  ov.innerHTML = `<p>Rata-rata keseluruhan${name ? ' ' + name : ''}: <span class="badge ${cls}">${d.overall.toFixed(2)} – ${d.overall_remark}</span>${n}</p>`;
+  if(chart){ chart.data.datasets[0].data = d.averages; chart.update(); }
+  else {
+    const ctx = document.getElementById('chart').getContext('2d');
+    chart = new Chart(ctx,{type:'bar',data:{labels:idx.labels,datasets:[{label:'Rata-rata',data:d.averages,backgroundColor:idx.labels.map(()=> '#2563eb')}]},options:{scales:{y:{beginAtZero:true,max:4}}}});
+  }
   const tbody = document.querySelector('#tblSummary tbody');
-  d.labels.forEach((l,i)=>{const avg=d.averages[i]; const rk=avg<d.threshold?'Evaluasi Diperlukan':'OK'; const c=rk==='OK'?'ok':'warn'; tbody.innerHTML+=`<tr><td>${l}</td><td>${avg.toFixed(2)}</td><td><span class='badge ${c}'>${rk}</span></td></tr>`});
+  tbody.innerHTML = '';
+  idx.labels.forEach((l,i)=>{const avg=d.averages[i]; const rk=avg<idx.threshold?'Evaluasi Diperlukan':'OK'; const c=rk==='OK'?'ok':'warn'; tbody.innerHTML+=`<tr><td>${l}</td><td>${avg.toFixed(2)}</td><td><span class='badge ${c}'>${rk}</span></td></tr>`});
   tbody.innerHTML+=`<tr><td><strong>Rata-rata Keseluruhan</strong></td><td><strong>${d.overall.toFixed(2)}</strong></td><td><span class='badge ${cls}'>${d.overall_remark}</span></td></tr>`;
-  const tbodyG=document.querySelector('#tblGroup tbody');
-  d.grouped.forEach(g=>{const c=g.remark==='OK'?'ok':'warn'; tbodyG.innerHTML+=`<tr><td>${g.name}</td><td>${g.avg.toFixed(2)}</td><td><span class='badge ${c}'>${g.remark}</span></td></tr>`});
 }
 load();
 </script>
 <p style='font-size:11px;opacity:.6'>Snapshot statis – fitur edit/CRUD dinonaktifkan.</p>
 </body></html>"""
-(docs / 'dashboard.html').write_text(dashboard_html, encoding='utf-8')
 
-print("Static snapshot generated in ./docs")
+def dashboard_html(assets):
+    return DASHBOARD_HTML.replace('__STYLE__', assets['style.css']).replace('__DATA__', assets['data.json']).encode('utf-8')
+
+def render(headers, rows):
+    """All outputs as ``{file name: bytes}`` (assets under fingerprinted names)."""
+    agg = aggregate(headers, rows)
+    data = compute(headers, rows, agg)
+    shards = shard_data(headers, rows, agg)
+    outputs, taken, shard_files = {}, set(), {}
+    for name, shard in shards.items():
+        content = compact_json(shard)
+        shard_files[name] = shard_file(name, content, taken)
+        outputs[shard_files[name]] = content
+    index = dict(data, shards=shard_files)
+    assets = {
+        'style.css': style_css(),
+        'qr.png': qr_png(),
+        'data.json': compact_json(index),
+    }
+    names = {name: fingerprinted(name, content) for name, content in assets.items()}
+    outputs.update({names[name]: content for name, content in assets.items()})
+    outputs['summary.csv'] = summary_csv(data)
+    outputs['full.csv'] = full_csv(headers, rows)
+    outputs['index.html'] = index_html(data, names)
+    outputs['dashboard.html'] = dashboard_html(names)
+    return outputs
+
+
+# --- incremental writer ----------------------------------------------------------
+def load_manifest(docs):
+    try:
+        return json.loads((docs / MANIFEST_NAME).read_text(encoding='utf-8'))
+    except (OSError, ValueError):
+        return {}
+
+def _write_atomic(path, content):
+    tmp = path.with_name(path.name + '.tmp')
+    tmp.write_bytes(content)
+    os.replace(tmp, path)
+
+def _write_output(docs, name, content):
+    _write_atomic(docs / name, content)
+    if GZIP_OUTPUTS:
+        # mtime=0 keeps the .gz byte-identical for identical content
+        _write_atomic(docs / (name + '.gz'), gzip.compress(content, compresslevel=9, mtime=0))
+
+def _is_current(docs, name, digest, old_files):
+    if old_files.get(name) != digest or not (docs / name).exists():
+        return False
+    return not GZIP_OUTPUTS or (docs / (name + '.gz')).exists()
+
+def write_outputs(docs, outputs, old_files):
+    """Write changed outputs in parallel and drop outputs of the previous build that are gone.
+
+    Returns ``(files, written, removed)`` where ``files`` maps name -> content hash.
+    """
+    docs.mkdir(parents=True, exist_ok=True)
+    files = {name: content_hash(content) for name, content in outputs.items()}
+    changed = sorted(n for n in outputs if not _is_current(docs, n, files[n], old_files))
+    with ThreadPoolExecutor(max_workers=WRITE_WORKERS) as pool:
+        list(pool.map(lambda n: _write_output(docs, n, outputs[n]), changed))
+    removed = sorted(set(old_files) - set(outputs))
+    for name in removed:
+        for path in (docs / name, docs / (name + '.gz')):
+            path.unlink(missing_ok=True)
+    return files, changed, removed
+
+def write_manifest(docs, manifest):
+    _write_atomic(docs / MANIFEST_NAME, json.dumps(manifest, ensure_ascii=False, indent=1, sort_keys=True).encode('utf-8'))
+
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    force = '--force' in argv
+    docs = DOCS_DIR
+    manifest = load_manifest(docs)
+    build = build_fingerprint()
+    same_build = not force and manifest.get('build') == build
+
+    ws = open_worksheet()
+    modified = last_update_time(ws)
+    if same_build and modified and manifest.get('modified_time') == modified:
+        print(f"Snapshot up to date (sheet not modified since {modified}); nothing to do.")
+        return 0
+    values = ws.get_all_values()
+    headers = values[0] if values else []
+    rows = values[1:] if len(values) > 1 else []
+    version = data_version(headers, rows)
+    if same_build and manifest.get('data_version') == version:
+        if modified and manifest.get('modified_time') != modified:
+            # Touched but same data: remember the new time so the next run skips the download.
+            write_manifest(docs, dict(manifest, modified_time=modified))
+        print(f"Snapshot up to date (data version {version}); nothing to do.")
+        return 0
+
+    outputs = render(headers, rows)
+    files, written, removed = write_outputs(docs, outputs, manifest.get('files', {}))
+    write_manifest(docs, {'data_version': version, 'build': build, 'modified_time': modified, 'files': files})
+    print(f"Static snapshot generated in {docs} (data {version}): "
+          f"{len(written)} written, {len(files) - len(written)} unchanged, {len(removed)} removed")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())